@@ -1,74 +1,149 @@
-from flask import Flask , request , jsonify , render_template
+from flask import Flask , request , jsonify , Response
+
+import CalculatorBatch
+from CalculatorExpression import ExpressionError, expression_cache
+import CalculatorNumeric
+from CalculatorCache import cached_route, json_operands, numeric_operands, path_operands, query_operands
+from CalculatorMetrics import init_metrics
+from CalculatorCatalogue import Catalogue, parse_page_args, stream_page
+from CalculatorRendering import init_rendering
+from CalculatorMiddleware import install_middleware
 
 app = Flask(__name__)
+metrics = init_metrics(app)
+renderer = init_rendering(app)
+limiter = install_middleware(app, metrics=metrics)
 
 products = [{"name": "bats", "price": 40}, {"name": "ball", "price": 20}]
+catalogue = Catalogue(products)
+
+# ?mode= or "mode" in the JSON body, unparsed; CalculatorNumeric.calculate checks it.
+def requested_mode():
+    data = request.get_json(silent=True) if request.is_json else None
+    return CalculatorNumeric.requested_mode(request.args, data)
 
 @app.route('/')
 
 def home():
-    return render_template("index.html")
+    return renderer.render_page("index.html")
 
 
 @app.route('/addnum/<n1>/<n2>')
+@cached_route('add', path_operands(numeric_operands('int')))
 def add(n1,n2):
- num = str(int(n1)+int(n2))
+ num, error = CalculatorNumeric.calculate(CalculatorNumeric.add, n1, n2, requested_mode(), 'int')
+ if error:
+  return jsonify({'error': error}), 400
 
- return num
+ return str(num)
 
 @app.route('/subtract/<n1>/<n2>')
-
+@cached_route('subtract', path_operands(numeric_operands('int')))
 def subtract(n1,n2):
- num = str(int(n1)-int(n2))
- return num
+ num, error = CalculatorNumeric.calculate(CalculatorNumeric.subtract, n1, n2, requested_mode(), 'int')
+ if error:
+  return jsonify({'error': error}), 400
+ return str(num)
 
 
 
 @app.route('/add', methods=['GET'])
+@cached_route('add_numbers', query_operands(numeric_operands()))
 def add_numbers():
-    num1 = request.args.get('num1')
-    num2 = request.args.get('num2')
-    
-    if num1 is None or num2 is None:
-        return jsonify({'error': 'Please provide both num1 and num2'}), 400
-
-    try:
-        result = float(num1) + float(num2)
-    except ValueError:
-        return jsonify({'error': 'Both num1 and num2 must be numbers'}), 400
+    result, error = CalculatorNumeric.calculate(
+        CalculatorNumeric.add, request.args.get('num1'), request.args.get('num2'), requested_mode())
+    if error:
+        return jsonify({'error': error}), 400
 
     return jsonify({'result': result})
 
 @app.route('/addnumpost', methods=['POST'])
+@cached_route('add_numbers1', json_operands(numeric_operands()))
 def add_numbers1():
     data = request.get_json()
-    num1 = data.get('num1')
-    num2 = data.get('num2')
-    
-    if num1 is None or num2 is None:
-        return jsonify({'error': 'Please provide both num1 and num2'}), 400
-
-    try:
-        result = float(num1) + float(num2)
-    except ValueError:
-        return jsonify({'error': 'Both num1 and num2 must be numbers'}), 400
+    result, error = CalculatorNumeric.calculate(
+        CalculatorNumeric.add, data.get('num1'), data.get('num2'), requested_mode())
+    if error:
+        return jsonify({'error': error}), 400
 
     return jsonify({'result': result})
 
 @app.route('/addnumwith', methods=['GET'])
+@cached_route('add_numbers2', query_operands(numeric_operands()))
 def add_numbers2():
-    num1 = request.args.get('num1')
-    num2 = request.args.get('num2')
-    
-    if num1 is None or num2 is None:
-        return "Please provide both num1 and num2", 400
+    result, error = CalculatorNumeric.calculate(
+        CalculatorNumeric.add, request.args.get('num1'), request.args.get('num2'), requested_mode())
+    if error:
+        return error, 400
+
+    return f"Result: {result}"
 
+@app.route('/batch', methods=['POST'])
+def batch():
+    binary = request.mimetype == 'application/octet-stream'
     try:
-        result = float(num1) + float(num2)
-    except ValueError:
-        return "Both num1 and num2 must be numbers", 400
+        if binary:
+            codes, num1, num2 = CalculatorBatch.parse_binary_operations(request.get_data())
+        else:
+            codes, num1, num2 = CalculatorBatch.parse_json_operations(request.get_json(silent=True))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    results = CalculatorBatch.evaluate(codes, num1, num2)
+    if binary:
+        return Response(CalculatorBatch.iter_binary_results(results), mimetype='application/octet-stream')
+    return Response(CalculatorBatch.iter_json_results(results), mimetype='application/json')
+
+@app.route('/eval', methods=['GET', 'POST'])
+def evaluate_expression():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Please provide a JSON object'}), 400
+        expression = data.get('expression')
+        variables = data.get('variables') or {}
+        if not isinstance(variables, dict):
+            return jsonify({'error': 'variables must be an object'}), 400
+    else:
+        expression = request.args.get('expr')
+        variables = {name: value for name, value in request.args.items() if name != 'expr'}
+
+    if expression is None:
+        return jsonify({'error': 'Please provide an expression'}), 400
+
+    try:
+        variables = {name: float(value) for name, value in variables.items()}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'All variables must be numbers'}), 400
+
+    try:
+        result = expression_cache.evaluate(expression, variables)
+    except ExpressionError as error:
+        return jsonify({'error': str(error)}), 400
+
+    return jsonify({'result': result})
+
+@app.route('/eval/stats')
+def expression_cache_stats():
+    return jsonify(expression_cache.stats())
+
+@app.route('/products', methods=['GET'])
+def list_products():
+    try:
+        page, next_cursor = catalogue.page(**parse_page_args(request.args))
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    return Response(stream_page(page, next_cursor), mimetype='application/json')
+
+@app.route('/products/<name>', methods=['GET'])
+def get_product(name):
+    found = catalogue.lookup(name)
+    if not found:
+        return jsonify({'error': f'No product named {name}'}), 404
+
+    return jsonify({'products': found})
 
-    return f"Result: {result}"
 if __name__ == '__main__':
 
     app.run(debug=True)
@@ -0,0 +1,148 @@
+import json
+import os
+from urllib.parse import parse_qs
+
+from CalculatorNumeric import add, calculate, requested_mode, subtract
+
+# ASGI version of the Calculator routes with async handlers and no framework underneath,
+# for running under a multi-worker ASGI server instead of Flask's development server:
+#
+#   python CalculatorASGI.py                                   (uvicorn, one worker per CPU)
+#   uvicorn CalculatorASGI:app --workers 4 --no-access-log
+#
+# Responses match Calculator.py route for route: both call CalculatorNumeric.calculate, so
+# numeric modes, validation and error messages are shared. CalculatorASGIBenchmark.py
+# compares their speed.
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def text(body: str, status: int = 200):
+    return status, 'text/html; charset=utf-8', body.encode('utf-8')
+
+
+def json_response(data: dict, status: int = 200):
+    return status, 'application/json', (json.dumps(data) + '\n').encode('utf-8')
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+async def path_operation(operation, n1: str, n2: str, args: dict):
+    result, error = calculate(operation, n1, n2, requested_mode(args), 'int')
+    if error:
+        return json_response({'error': error}, 400)
+    return text(str(result))
+
+
+async def add_numbers(args: dict):
+    result, error = calculate(add, args.get('num1'), args.get('num2'), requested_mode(args))
+    if error:
+        return json_response({'error': error}, 400)
+    return json_response({'result': result})
+
+
+async def add_numbers1(args: dict, headers: dict, body: bytes):
+    if headers.get(b'content-type', b'').split(b';')[0].strip() != b'application/json':
+        raise HTTPError(415, 'Unsupported Media Type')
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, 'Bad Request')
+    if not isinstance(data, dict):
+        raise HTTPError(500, 'Internal Server Error')
+    result, error = calculate(add, data.get('num1'), data.get('num2'), requested_mode(args, data))
+    if error:
+        return json_response({'error': error}, 400)
+    return json_response({'result': result})
+
+
+async def add_numbers2(args: dict):
+    result, error = calculate(add, args.get('num1'), args.get('num2'), requested_mode(args))
+    if error:
+        return text(error, 400)
+    return text(f"Result: {result}")
+
+
+ROUTES = {
+    # first path segment: (number of segments, allowed methods)
+    'addnum': (3, ('GET', 'HEAD')),
+    'subtract': (3, ('GET', 'HEAD')),
+    'add': (1, ('GET', 'HEAD')),
+    'addnumwith': (1, ('GET', 'HEAD')),
+    'addnumpost': (1, ('POST',))
+}
+
+
+async def dispatch(scope, receive):
+    parts = scope['path'].strip('/').split('/')
+    route = ROUTES.get(parts[0])
+    if route is None or route[0] != len(parts):
+        raise HTTPError(404, 'Not Found')
+    if scope['method'] not in route[1]:
+        raise HTTPError(405, 'Method Not Allowed')
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    args = {name: values[0] for name, values in query.items()}
+    if parts[0] in ('addnum', 'subtract'):
+        return await path_operation(add if parts[0] == 'addnum' else subtract, parts[1], parts[2], args)
+    if parts[0] == 'addnumpost':
+        headers = dict(scope.get('headers', []))
+        return await add_numbers1(args, headers, await read_body(receive))
+    return await (add_numbers if parts[0] == 'add' else add_numbers2)(args)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    try:
+        status, content_type, body = await dispatch(scope, receive)
+    except HTTPError as error:
+        status, content_type, body = text(error.message, error.status)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1'))
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'CalculatorASGI:app',
+        host=os.environ.get('CALCULATOR_HOST', '127.0.0.1'),
+        port=int(os.environ.get('CALCULATOR_PORT', '8000')),
+        workers=int(os.environ.get('CALCULATOR_WORKERS', os.cpu_count() or 1)),
+        log_level='warning',
+        access_log=False
+    )
@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+# Requests/sec and latency of the Flask app (Calculator.py) against the ASGI app
+# (CalculatorASGI.py) on the same machine. Both servers are started locally on free ports:
+#
+#   python CalculatorASGIBenchmark.py --duration 10 --concurrency 64 --workers 4
+#
+# The load generator is a small asyncio HTTP/1.1 client, so nothing beyond the servers
+# themselves (Flask, uvicorn) needs to be installed.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+REQUESTS = {
+    'addnum': ('GET', '/addnum/17/25', None),
+    'add': ('GET', '/add?num1=1.5&num2=2.25', None),
+    'addnumwith': ('GET', '/addnumwith?num1=1.5&num2=2.25', None),
+    'addnumpost': ('POST', '/addnumpost', {'num1': 1.5, 'num2': 2.25})
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def start_flask(port: int, debug: bool) -> subprocess.Popen:
+    code = f"import Calculator; Calculator.app.run(host='127.0.0.1', port={port}, debug={debug}, use_reloader=False)"
+    return subprocess.Popen([sys.executable, '-c', code], cwd=HERE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_asgi(port: int, workers: int) -> subprocess.Popen:
+    command = [sys.executable, '-m', 'uvicorn', 'CalculatorASGI:app', '--host', '127.0.0.1',
+               '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    return subprocess.Popen(command, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_request(method: str, path: str, payload, port: int) -> bytes:
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    head = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{port}", f"Content-Length: {len(body)}"]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body
+
+
+async def send_request(reader, writer, raw: bytes):
+    # Returns (status, body, keep_alive).
+    writer.write(raw)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+    keep_alive = status_line.startswith(b'HTTP/1.1') and headers.get('connection', '').lower() != 'close'
+    return int(status_line.split()[1]), body, keep_alive
+
+
+async def run_load(port: int, raw: bytes, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                status, _, keep_alive = await send_request(reader, writer, raw)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                errors += 1
+                writer = None
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarise(latencies, elapsed, errors)
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarise(latencies: list, elapsed: float, errors: int) -> dict:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'requests_per_second': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000
+    }
+
+
+def benchmark(name: str, process: subprocess.Popen, port: int, args) -> dict:
+    try:
+        wait_for_port(port, process)
+        results = {}
+        for route in args.routes:
+            method, path, payload = REQUESTS[route]
+            raw = build_request(method, path, payload, port)
+            asyncio.run(run_load(port, raw, args.concurrency, min(1.0, args.duration)))  # warm-up
+            results[route] = asyncio.run(run_load(port, raw, args.concurrency, args.duration))
+            stats = results[route]
+            print(f"{name:<6} {route:<11} {stats['requests_per_second']:>10,.0f} req/s "
+                  f"p50 {stats['p50_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms  errors {stats['errors']}")
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs ASGI Calculator benchmark")
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds of load per route')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='ASGI worker processes')
+    parser.add_argument('--routes', nargs='+', default=list(REQUESTS), choices=list(REQUESTS))
+    parser.add_argument('--flask-debug', action='store_true', help='Run Flask with debug=True as Calculator.py does')
+    parser.add_argument('--output', type=str, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    flask_port = free_port()
+    results = {'flask': benchmark('flask', start_flask(flask_port, args.flask_debug), flask_port, args)}
+    asgi_port = free_port()
+    results['asgi'] = benchmark('asgi', start_asgi(asgi_port, args.workers), asgi_port, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=4)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import math
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Batch evaluation for the /batch endpoint.
+#
+# JSON body:   {"operations": [{"op": "add", "num1": 1, "num2": 2}, ...]}
+#              (a bare list of operations is accepted too)
+# Binary body: Content-Type application/octet-stream, back to back little-endian records of
+#              uint8 op code + float64 num1 + float64 num2 (see OP_CODES / RECORD)
+# Results come back in the same order: a streamed JSON {"results": [...]} document, or
+# packed little-endian float64s for binary requests. Division by zero gives null (JSON) or NaN.
+
+OPERATIONS = ('add', 'subtract', 'multiply', 'divide')
+OP_CODES = {name: code for code, name in enumerate(OPERATIONS)}
+RECORD = struct.Struct('<Bdd')
+MAX_BATCH = 100000
+CHUNK = 4096
+
+
+def parse_json_operations(payload):
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    if not isinstance(operations, list):
+        raise ValueError("Please provide a list of operations")
+    if len(operations) > MAX_BATCH:
+        raise ValueError(f"A batch can hold at most {MAX_BATCH} operations")
+    codes = array('B')
+    num1 = array('d')
+    num2 = array('d')
+    for index, operation in enumerate(operations):
+        try:
+            codes.append(OP_CODES[operation['op']])
+            num1.append(float(operation['num1']))
+            num2.append(float(operation['num2']))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Operation {index} must have an op in {list(OPERATIONS)} and numeric num1 and num2")
+    return codes, num1, num2
+
+
+def parse_binary_operations(body: bytes):
+    if len(body) % RECORD.size:
+        raise ValueError(f"Binary batches must be a multiple of {RECORD.size} bytes")
+    count = len(body) // RECORD.size
+    if count > MAX_BATCH:
+        raise ValueError(f"A batch can hold at most {MAX_BATCH} operations")
+    if np is not None:
+        records = np.frombuffer(body, dtype=np.dtype([('op', '<u1'), ('num1', '<f8'), ('num2', '<f8')]))
+        codes, num1, num2 = records['op'], records['num1'], records['num2']
+        if count and codes.max() >= len(OPERATIONS):
+            raise ValueError(f"Unknown op code in batch, expected 0-{len(OPERATIONS) - 1}")
+        return codes, num1, num2
+    codes = array('B')
+    num1 = array('d')
+    num2 = array('d')
+    for code, first, second in RECORD.iter_unpack(body):
+        if code >= len(OPERATIONS):
+            raise ValueError(f"Unknown op code in batch, expected 0-{len(OPERATIONS) - 1}")
+        codes.append(code)
+        num1.append(first)
+        num2.append(second)
+    return codes, num1, num2
+
+
+def evaluate(codes, num1, num2):
+    # One vectorised pass with NumPy when it is installed, a plain loop otherwise.
+    if np is not None:
+        codes = np.asarray(codes)
+        num1 = np.asarray(num1, dtype=np.float64)
+        num2 = np.asarray(num2, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            quotient = np.where(num2 != 0, num1 / np.where(num2 != 0, num2, 1), np.nan)
+        return np.choose(codes, [num1 + num2, num1 - num2, num1 * num2, quotient])
+    results = array('d')
+    nan = math.nan
+    for code, first, second in zip(codes, num1, num2):
+        if code == 0:
+            results.append(first + second)
+        elif code == 1:
+            results.append(first - second)
+        elif code == 2:
+            results.append(first * second)
+        else:
+            results.append(first / second if second else nan)
+    return results
+
+
+def iter_json_results(results):
+    # Streams {"results": [...]} in chunks instead of building one big string.
+    if np is not None:
+        results = results.tolist()
+    yield '{"results":['
+    for start in range(0, len(results), CHUNK):
+        chunk = results[start:start + CHUNK]
+        text = ','.join(repr(value) if math.isfinite(value) else 'null' for value in chunk)
+        yield (',' if start else '') + text
+    yield ']}'
+
+
+def iter_binary_results(results):
+    if np is not None:
+        data = np.asarray(results, dtype='<f8').tobytes()
+    else:
+        packed = array('d', results)
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        data = packed.tobytes()
+    step = CHUNK * 8
+    for start in range(0, len(data), step):
+        yield data[start:start + step]
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+from CalculatorASGIBenchmark import build_request, free_port, send_request, start_flask, summarise, wait_for_port
+
+# Benchmark suite for the Calculator routes, run in-process through Flask's test client
+# and against a locally spawned Calculator.py server (loopback only):
+#
+#   python CalculatorBenchmark.py --mode both --concurrency 1 8 32 --output bench.json
+#   python CalculatorBenchmark.py --baseline bench.json     (exit code 1 on a regression)
+#
+# Each request gets its own operands ({i} below), so the result cache from CalculatorCache
+# is not measuring itself; pass --distinct 1 to benchmark cache hits instead.
+
+REQUESTS = {
+    'addnum': ('GET', '/addnum/{i}/25', None),
+    'subtract': ('GET', '/subtract/{i}/25', None),
+    'add': ('GET', '/add?num1={i}.5&num2=2.25', None),
+    'addnumwith': ('GET', '/addnumwith?num1={i}.5&num2=2.25', None),
+    'addnumpost': ('POST', '/addnumpost', {'num1': '{i}.5', 'num2': 2.25})
+}
+
+
+def variants(route: str, distinct: int) -> list:
+    method, path, payload = REQUESTS[route]
+    requests = []
+    for i in range(distinct):
+        body = None
+        if payload is not None:
+            body = {name: float(value.format(i=i)) if isinstance(value, str) else value
+                    for name, value in payload.items()}
+        requests.append((method, path.format(i=i), body))
+    return requests
+
+
+def test_client():
+    import Calculator
+
+    Calculator.app.config['TESTING'] = True
+    return Calculator.app.test_client()
+
+
+def run_test_client(route: str, concurrency: int, duration: float, distinct: int) -> dict:
+    requests = variants(route, distinct)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset: int):
+        client = test_client()
+        local = []
+        failed = 0
+        n = offset
+        while time.perf_counter() < deadline:
+            method, path, payload = requests[n % len(requests)]
+            n += concurrency
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=payload)
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarise(latencies, time.perf_counter() - started, errors[0])
+
+
+async def run_server(port: int, route: str, concurrency: int, duration: float, distinct: int) -> dict:
+    raws = [build_request(method, path, payload, port) for method, path, payload in variants(route, distinct)]
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset: int):
+        nonlocal errors
+        reader = writer = None
+        n = offset
+        while time.perf_counter() < deadline:
+            raw = raws[n % len(raws)]
+            n += concurrency
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                status, _, keep_alive = await send_request(reader, writer, raw)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                errors += 1
+                writer = None
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return summarise(latencies, time.perf_counter() - started, errors)
+
+
+def measure_allocations(route: str, samples: int, distinct: int) -> dict:
+    # Single-threaded, through the test client: average number and size of memory blocks
+    # allocated while handling one request, and the blocks still alive after all samples.
+    client = test_client()
+    requests = variants(route, distinct)
+    for method, path, payload in requests[:10]:
+        client.open(path, method=method, json=payload)  # warm-up: imports, url map, caches
+
+    tracemalloc.start()
+    try:
+        peak_bytes = 0
+        before = tracemalloc.take_snapshot()
+        for n in range(samples):
+            method, path, payload = requests[n % len(requests)]
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            client.open(path, method=method, json=payload)
+            peak_bytes += tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained = after.compare_to(before, 'filename')
+    return {
+        'samples': samples,
+        'peak_bytes_per_request': peak_bytes / samples,
+        'retained_blocks': sum(stat.count_diff for stat in retained),
+        'retained_bytes': sum(stat.size_diff for stat in retained)
+    }
+
+
+def report(mode: str, route: str, concurrency: int, stats: dict):
+    print(f"{mode:<11} {route:<11} c={concurrency:<4} {stats['requests_per_second']:>10,.0f} req/s "
+          f"p50 {stats['p50_ms']:7.3f} ms  p95 {stats['p95_ms']:7.3f} ms  p99 {stats['p99_ms']:7.3f} ms  "
+          f"errors {stats['errors']}")
+
+
+def run(args) -> dict:
+    results = {}
+    if args.mode in ('test-client', 'both'):
+        results['test-client'] = {}
+        for route in args.routes:
+            results['test-client'][route] = {}
+            run_test_client(route, 1, min(0.5, args.duration), args.distinct)  # warm-up
+            for concurrency in args.concurrency:
+                stats = run_test_client(route, concurrency, args.duration, args.distinct)
+                results['test-client'][route][str(concurrency)] = stats
+                report('test-client', route, concurrency, stats)
+
+    if args.mode in ('server', 'both'):
+        results['server'] = {}
+        port = free_port()
+        process = start_flask(port, False)
+        try:
+            wait_for_port(port, process)
+            for route in args.routes:
+                results['server'][route] = {}
+                asyncio.run(run_server(port, route, 1, min(0.5, args.duration), args.distinct))  # warm-up
+                for concurrency in args.concurrency:
+                    stats = asyncio.run(run_server(port, route, concurrency, args.duration, args.distinct))
+                    results['server'][route][str(concurrency)] = stats
+                    report('server', route, concurrency, stats)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    if args.alloc_samples:
+        results['allocations'] = {}
+        for route in args.routes:
+            stats = measure_allocations(route, args.alloc_samples, args.distinct)
+            results['allocations'][route] = stats
+            print(f"allocations {route:<11} {stats['peak_bytes_per_request']:>10,.0f} B peak/request  "
+                  f"retained {stats['retained_blocks']} blocks ({stats['retained_bytes']} B)")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # A regression is throughput lower, or p99 higher, than the baseline by more than tolerance.
+    regressions = []
+    for mode in ('test-client', 'server'):
+        for route, levels in results.get(mode, {}).items():
+            for concurrency, stats in levels.items():
+                old = baseline.get(mode, {}).get(route, {}).get(concurrency)
+                if old is None:
+                    continue
+                name = f"{mode} {route} c={concurrency}"
+                if stats['requests_per_second'] < old['requests_per_second'] * (1 - tolerance):
+                    regressions.append(f"{name}: {stats['requests_per_second']:,.0f} req/s "
+                                       f"(baseline {old['requests_per_second']:,.0f})")
+                if stats['p99_ms'] > old['p99_ms'] * (1 + tolerance):
+                    regressions.append(f"{name}: p99 {stats['p99_ms']:.3f} ms (baseline {old['p99_ms']:.3f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculator endpoint benchmark suite")
+    parser.add_argument('--mode', choices=['test-client', 'server', 'both'], default='both')
+    parser.add_argument('--routes', nargs='+', default=list(REQUESTS), choices=list(REQUESTS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8], help='Concurrency levels to run')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds of load per route and level')
+    parser.add_argument('--distinct', type=int, default=10000, help='Distinct operand sets per route')
+    parser.add_argument('--alloc-samples', type=int, default=200, help='Requests traced per route (0 to skip)')
+    parser.add_argument('--output', type=str, help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', type=str, help='Earlier --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed regression, as a fraction')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'config': vars(args),
+                'python': sys.version,
+                'platform': platform.platform(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results
+            }, f, indent=4)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
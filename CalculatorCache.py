@@ -0,0 +1,234 @@
+import argparse
+import functools
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+from flask import make_response, request
+
+from CalculatorNumeric import parse, request_mode
+
+# Response cache for the deterministic Calculator routes.
+#
+# Entries are keyed on (operation, normalised operands), so /add?num1=1&num2=2 and
+# /add?num1=1.0&num2=2 share one entry, and a hit is answered before the view runs. Every
+# cached response carries an ETag and Cache-Control, and If-None-Match gets a 304.
+#
+# By default each worker process keeps its own LRU. To share one cache between workers, run
+#   python CalculatorCache.py --address /tmp/calculator-cache.sock
+# and start the app with CALCULATOR_CACHE_ADDRESS=/tmp/calculator-cache.sock (a unix socket
+# path or host:port). Both sides need the same CALCULATOR_CACHE_AUTHKEY: the manager
+# protocol unpickles what peers send, so there is no default key.
+
+CACHE_CONTROL = 'public, max-age=86400'
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _CacheServer(BaseManager):
+    pass
+
+
+class _CacheClient(BaseManager):
+    pass
+
+
+_CacheClient.register('get_cache')
+
+
+def parse_address(address: str):
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def manager_authkey(variable: str) -> bytes:
+    authkey = os.environ.get(variable)
+    if not authkey:
+        raise RuntimeError(f"{variable} must be set to a secret shared by the server and its clients")
+    return authkey.encode('utf-8')
+
+
+def serve_shared_cache(address: str, maxsize: int, authkey: bytes):
+    cache = LRUCache(maxsize)
+    _CacheServer.register('get_cache', callable=lambda: cache)
+    server = _CacheServer(address=parse_address(address), authkey=authkey).get_server()
+    print(f"Shared calculator cache listening on {address}")
+    server.serve_forever()
+
+
+class SharedCache:
+    # Client for serve_shared_cache. Each thread gets its own connection (BaseProxy does that).
+    # The server is connected on first use, and any backend failure is treated as a miss
+    # so the view still answers; after a failure the next connect is tried RETRY_AFTER later.
+    RETRY_AFTER = 5.0
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self._authkey = authkey
+        self._cache = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        cache = self._cache
+        if cache is not None:
+            return cache
+        with self._lock:
+            if self._cache is None and time.monotonic() >= self._retry_at:
+                try:
+                    manager = _CacheClient(address=parse_address(self.address), authkey=self._authkey)
+                    manager.connect()
+                    self._cache = manager.get_cache()
+                except Exception:
+                    self._retry_at = time.monotonic() + self.RETRY_AFTER
+            return self._cache
+
+    def _failed(self):
+        with self._lock:
+            self._cache = None
+            self._retry_at = time.monotonic() + self.RETRY_AFTER
+
+    def get(self, key):
+        cache = self._connect()
+        if cache is None:
+            return None
+        try:
+            return cache.get(key)
+        except Exception:
+            self._failed()
+            return None
+
+    def set(self, key, value):
+        cache = self._connect()
+        if cache is None:
+            return
+        try:
+            cache.set(key, value)
+        except Exception:
+            self._failed()
+
+
+def create_cache():
+    address = os.environ.get('CALCULATOR_CACHE_ADDRESS')
+    if address:
+        return SharedCache(address, manager_authkey('CALCULATOR_CACHE_AUTHKEY'))
+    return LRUCache(int(os.environ.get('CALCULATOR_CACHE_SIZE', '10000')))
+
+
+result_cache = create_cache()
+
+
+def int_operands(num1, num2):
+    return int(num1), int(num2)
+
+
+def float_operands(num1, num2):
+    # Keyed on repr so -0.0 and 0.0, which compare equal, get separate entries.
+    operands = float(num1), float(num2)
+    if any(math.isnan(operand) for operand in operands):
+        raise ValueError("NaN operands are not cached")
+    return tuple(repr(operand) for operand in operands)
+
+
+def numeric_operands(default_mode: str = None):
+    # Keys on the request's numeric mode too. Equal values can print differently in
+    # decimal mode (1.0 vs 1), so the exact modes key on the printed operand.
+    def normalise(num1, num2):
+        mode = request_mode(default_mode)
+        if mode == 'float':
+            return (mode,) + float_operands(num1, num2)
+        return (mode, str(parse(num1, mode)), str(parse(num2, mode)))
+    return normalise
+
+
+def path_operands(normalise):
+    return lambda kwargs: normalise(kwargs['n1'], kwargs['n2'])
+
+
+def query_operands(normalise):
+    return lambda kwargs: normalise(request.args['num1'], request.args['num2'])
+
+
+def json_operands(normalise):
+    def operands(kwargs):
+        data = request.get_json(silent=True)
+        return normalise(data['num1'], data['num2'])
+    return operands
+
+
+def cached_route(operation: str, operands):
+    # operands(view_kwargs) returns the normalised operand tuple, or raises for requests that
+    # should go straight to the view (missing or invalid input, which the view reports).
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            try:
+                key = (operation,) + operands(kwargs)
+            except (KeyError, TypeError, ValueError):
+                return view(**kwargs)
+
+            entry = result_cache.get(key)
+            if entry is None:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+                entry = (body, response.mimetype, etag)
+                result_cache.set(key, entry)
+
+            body, mimetype, etag = entry
+            # Only GET/HEAD responses are cacheable by clients; a POST still shares the
+            # server-side result but gets no validator or freshness headers.
+            cacheable = request.method in ('GET', 'HEAD')
+            if cacheable and request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(body)
+                response.mimetype = mimetype
+            if cacheable:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shared result cache for Calculator workers")
+    parser.add_argument('--address', type=str, required=True, help='Unix socket path or host:port to listen on')
+    parser.add_argument('--maxsize', type=int, default=100000, help='Maximum number of cached results')
+    args = parser.parse_args()
+    try:
+        authkey = manager_authkey('CALCULATOR_CACHE_AUTHKEY')
+    except RuntimeError as error:
+        parser.error(str(error))
+    serve_shared_cache(args.address, args.maxsize, authkey)
@@ -0,0 +1,132 @@
+import base64
+import json
+import math
+from bisect import bisect_left, bisect_right
+
+# Read-only product catalogue behind the /products routes. Built once from a list of
+# {"name": ..., "price": ...} dicts with two indexes, so no request scans the list:
+#   - a hash index from name to product positions, for lookups and name filters;
+#   - a sorted (price, position) index, bisected for price ranges, plus one per name.
+# Pages are ordered by position (or by price when a price range is given) and continue
+# from an opaque cursor, which stays valid however deep the client pages.
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+CHUNK = 256
+
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if isinstance(key, list):
+        key = tuple(key)
+    return key
+
+
+def _valid_position(position) -> bool:
+    return type(position) is int and position >= 0
+
+
+def _valid_cursor(key, by_price: bool) -> bool:
+    # Cursors come from the client: a negative position would index from the end.
+    if by_price:
+        return (isinstance(key, tuple) and len(key) == 2
+                and type(key[0]) in (int, float) and math.isfinite(key[0]) and _valid_position(key[1]))
+    return _valid_position(key)
+
+
+class Catalogue:
+    def __init__(self, products: list):
+        self._products = list(products)
+        self._by_name = {}
+        price_index = []
+        for position, product in enumerate(self._products):
+            self._by_name.setdefault(product.get('name'), []).append(position)
+            price = product.get('price')
+            if isinstance(price, (int, float)) and not isinstance(price, bool):
+                price_index.append((price, position))
+        price_index.sort()
+        self._price_index = price_index
+        # Per-name price indexes, for name and price filters combined.
+        self._name_price_index = {}
+        for price, position in price_index:
+            self._name_price_index.setdefault(self._products[position].get('name'), []).append((price, position))
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def lookup(self, name: str) -> list:
+        return [self._products[position] for position in self._by_name.get(name, ())]
+
+    def page(self, name: str = None, min_price: float = None, max_price: float = None,
+             limit: int = DEFAULT_LIMIT, cursor: str = None):
+        # Returns (products, next_cursor); next_cursor is None on the last page.
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        after = decode_cursor(cursor) if cursor else None
+        by_price = min_price is not None or max_price is not None
+        if after is not None and not _valid_cursor(after, by_price):
+            raise ValueError("Invalid cursor")
+
+        if by_price:
+            keys = self._price_range(min_price, max_price, name, after, limit + 1)
+        elif name is not None:
+            positions = self._by_name.get(name, [])
+            start = bisect_right(positions, after) if after is not None else 0
+            keys = positions[start:start + limit + 1]
+        else:
+            start = after + 1 if after is not None else 0
+            keys = range(start, min(start + limit + 1, len(self._products)))
+
+        next_cursor = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = encode_cursor(list(keys[-1]) if by_price else keys[-1])
+        positions = [key[1] for key in keys] if by_price else keys
+        return [self._products[position] for position in positions], next_cursor
+
+    def _price_range(self, min_price, max_price, name, after, count: int) -> list:
+        index = self._price_index if name is None else self._name_price_index.get(name, [])
+        low = bisect_left(index, (min_price, -1)) if min_price is not None else 0
+        high = bisect_right(index, (max_price, math.inf)) if max_price is not None else len(index)
+        if after is not None:
+            low = max(low, bisect_right(index, after))
+        return index[low:min(high, low + count)]
+
+
+def parse_page_args(args) -> dict:
+    def price(field):
+        value = args.get(field)
+        if value is None:
+            return None
+        number = float(value)
+        if math.isnan(number):
+            raise ValueError(f"{field} must be a number")
+        return number
+
+    try:
+        return {
+            'name': args.get('name'),
+            'min_price': price('min_price'),
+            'max_price': price('max_price'),
+            'limit': int(args.get('limit', DEFAULT_LIMIT)),
+            'cursor': args.get('cursor')
+        }
+    except ValueError:
+        raise ValueError("min_price, max_price and limit must be numbers")
+
+
+def stream_page(products: list, next_cursor):
+    # Yields the page as JSON in chunks of CHUNK products, so a large page is never held
+    # as one string.
+    yield '{"products": ['
+    for start in range(0, len(products), CHUNK):
+        chunk = ', '.join(json.dumps(product) for product in products[start:start + CHUNK])
+        yield chunk if start == 0 else ', ' + chunk
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}\n'
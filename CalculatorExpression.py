@@ -0,0 +1,274 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+
+# Safe arithmetic expressions for the /eval endpoint: numbers, variables, + - * /, unary
+# minus and parentheses. Text is tokenized, parsed into an AST and compiled to a small
+# stack bytecode; no eval() anywhere. Compiled programs are kept in an LRU cache keyed by
+# the normalised token stream, so a formula that is sent again skips parsing and compiling.
+# Expressions are limited to MAX_LENGTH characters and MAX_DEPTH nested parentheses or
+# unary signs, so neither the parser's recursion nor the integers can grow without bound.
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+TOKEN = re.compile(r'\s*(?:(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?|([A-Za-z_][A-Za-z_0-9]*)|(.))')
+MAX_LENGTH = 1000
+MAX_DEPTH = 100
+
+# Bytecode
+PUSH, LOAD, ADD, SUB, MUL, DIV, NEG = range(7)
+BINARY = {'+': ADD, '-': SUB, '*': MUL, '/': DIV}
+
+
+def tokenize(text: str, literals: list = None) -> list:
+    # literals, if given, receives the source text of each token (see normalise).
+    if not isinstance(text, str):
+        raise ExpressionError("The expression must be a string")
+    if len(text) > MAX_LENGTH:
+        raise ExpressionError(f"Expressions are limited to {MAX_LENGTH} characters")
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        number, exponent, name, symbol = match.groups()
+        if number is not None:
+            literal = number + (exponent or '')
+            tokens.append(('number', float(literal) if '.' in literal or exponent else int(literal)))
+        elif name is not None:
+            literal = name
+            tokens.append(('name', name))
+        elif symbol in '+-*/()':
+            literal = symbol
+            tokens.append((symbol, symbol))
+        else:
+            raise ExpressionError(f"Unexpected character {symbol!r} at position {match.start(4)}")
+        if literals is not None:
+            literals.append(literal)
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    # Recursive descent:
+    #   expr   := term (('+' | '-') term)*
+    #   term   := factor (('*' | '/') factor)*
+    #   factor := ('+' | '-') factor | number | name | '(' expr ')'
+    # AST nodes are tuples: ('number', value), ('name', name), ('neg', node), (op, left, right).
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def _peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        node = self._expr()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected {self.tokens[self.position][1]!r}")
+        return node
+
+    def _expr(self):
+        node = self._term()
+        while self._peek() in ('+', '-'):
+            op = self._take()[0]
+            node = (op, node, self._term())
+        return node
+
+    def _term(self):
+        node = self._factor()
+        while self._peek() in ('*', '/'):
+            op = self._take()[0]
+            node = (op, node, self._factor())
+        return node
+
+    def _factor(self):
+        kind = self._peek()
+        if kind is None:
+            raise ExpressionError("Unexpected end of expression")
+        if kind in ('number', 'name'):
+            return self._take()
+        if kind not in ('+', '-', '('):
+            raise ExpressionError(f"Unexpected {self.tokens[self.position][1]!r}")
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ExpressionError(f"Expressions are limited to {MAX_DEPTH} levels of nesting")
+        self._take()
+        if kind == '(':
+            node = self._expr()
+            if self._peek() != ')':
+                raise ExpressionError("Missing closing parenthesis")
+            self._take()
+        else:
+            node = self._factor()
+            if kind == '-':
+                node = ('neg', node)
+        self.depth -= 1
+        return node
+
+
+def _apply(op: int, left, right):
+    # An int too large for a float overflows as soon as it meets a float operand (or is
+    # divided), in any of the four operations.
+    try:
+        if op == ADD:
+            return left + right
+        if op == SUB:
+            return left - right
+        if op == MUL:
+            return left * right
+        if right == 0:
+            raise ExpressionError("Division by zero")
+        return left / right
+    except OverflowError as error:
+        raise ExpressionError("The result is out of range") from error
+
+
+class CompiledExpression:
+    def __init__(self, text: str, code: list, variables: tuple):
+        self.text = text
+        self.code = code
+        self.variables = variables
+
+    def evaluate(self, variables: dict = None):
+        variables = variables or {}
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for op, arg in self.code:
+            if op == PUSH:
+                push(arg)
+            elif op == LOAD:
+                if arg not in variables:
+                    raise ExpressionError(f"Variable {arg!r} is not defined")
+                push(variables[arg])
+            elif op == NEG:
+                push(-pop())
+            else:
+                right = pop()
+                push(_apply(op, pop(), right))
+        result = stack[0]
+        # inf and nan have no JSON representation
+        if type(result) is float and not math.isfinite(result):
+            raise ExpressionError("The result is out of range")
+        return result
+
+
+def fold_constants(node):
+    kind = node[0]
+    if kind in ('number', 'name'):
+        return node
+    if kind == 'neg':
+        operand = fold_constants(node[1])
+        return ('number', -operand[1]) if operand[0] == 'number' else ('neg', operand)
+    left = fold_constants(node[1])
+    right = fold_constants(node[2])
+    if left[0] == 'number' and right[0] == 'number':
+        return ('number', _apply(BINARY[kind], left[1], right[1]))
+    return (kind, left, right)
+
+
+def _emit(node, code: list, names: list):
+    kind = node[0]
+    if kind == 'number':
+        code.append((PUSH, node[1]))
+    elif kind == 'name':
+        code.append((LOAD, node[1]))
+        if node[1] not in names:
+            names.append(node[1])
+    elif kind == 'neg':
+        _emit(node[1], code, names)
+        code.append((NEG, None))
+    else:
+        _emit(node[1], code, names)
+        _emit(node[2], code, names)
+        code.append((BINARY[kind], None))
+
+
+def compile_tokens(text: str, tokens: list) -> CompiledExpression:
+    ast = fold_constants(Parser(tokens).parse())
+    code = []
+    names = []
+    _emit(ast, code, names)
+    return CompiledExpression(text, code, tuple(names))
+
+
+def compile_expression(text: str) -> CompiledExpression:
+    return compile_tokens(text, tokenize(text))
+
+
+def _join(tokens: list, literals: list) -> str:
+    # One space between adjacent numbers or names, none elsewhere, so "a * (b+1)" and
+    # "a*(b + 1)" share a cache entry while "1 2" and "1e - 5" stay as invalid as they were.
+    parts = []
+    previous = None
+    for (kind, _), literal in zip(tokens, literals):
+        if kind in ('number', 'name') and previous in ('number', 'name'):
+            parts.append(' ')
+        parts.append(literal)
+        previous = kind
+    return ''.join(parts)
+
+
+def normalise(text: str) -> str:
+    literals = []
+    return _join(tokenize(text, literals), literals)
+
+
+class ExpressionCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._programs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> CompiledExpression:
+        literals = []
+        tokens = tokenize(text, literals)
+        key = _join(tokens, literals)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                self.hits += 1
+                return program
+            self.misses += 1
+        # Compile outside the lock; a concurrent miss on the same text just compiles twice.
+        program = compile_tokens(key, tokens)
+        with self._lock:
+            self._programs[key] = program
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.maxsize:
+                self._programs.popitem(last=False)
+                self.evictions += 1
+        return program
+
+    def evaluate(self, text: str, variables: dict = None):
+        return self.get(text).evaluate(variables)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._programs),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+expression_cache = ExpressionCache()
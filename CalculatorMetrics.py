@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from flask import Response, g, request
+
+# Per-route latency histograms, request counts and error counts for the Calculator app,
+# served on /metrics in the Prometheus text format. Hooks only take two perf_counter()
+# readings, a bisect and a few increments under one short lock per request.
+#
+#   from CalculatorMetrics import init_metrics
+#   init_metrics(app)
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class RouteStats:
+    __slots__ = ('buckets', 'total', 'count', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.statuses = {}
+
+
+class Metrics:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, method: str, status: int, seconds: float):
+        key = (route, method)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.buckets[bisect_left(BUCKETS, seconds)] += 1
+            stats.total += seconds
+            stats.count += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def render(self) -> str:
+        with self._lock:
+            routes = [(key, stats.buckets[:], stats.total, stats.count, dict(stats.statuses))
+                      for key, stats in sorted(self._routes.items())]
+        lines = [
+            '# HELP calculator_request_duration_seconds Request latency by route.',
+            '# TYPE calculator_request_duration_seconds histogram'
+        ]
+        for (route, method), buckets, total, count, _ in routes:
+            labels = f'route="{_escape(route)}",method="{method}"'
+            cumulative = 0
+            for bound, observed in zip(BUCKETS, buckets):
+                cumulative += observed
+                lines.append(f'calculator_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'calculator_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'calculator_request_duration_seconds_sum{{{labels}}} {total}')
+            lines.append(f'calculator_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines.append('# HELP calculator_requests_total Requests by route and status code.')
+        lines.append('# TYPE calculator_requests_total counter')
+        for (route, method), _, _, _, statuses in routes:
+            for status, observed in sorted(statuses.items()):
+                labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                lines.append(f'calculator_requests_total{{{labels}}} {observed}')
+
+        lines.append('# HELP calculator_request_errors_total Requests answered with a 4xx or 5xx status.')
+        lines.append('# TYPE calculator_request_errors_total counter')
+        for (route, method), _, _, _, statuses in routes:
+            errors = sum(observed for status, observed in statuses.items() if status >= 400)
+            lines.append(f'calculator_request_errors_total{{route="{_escape(route)}",method="{method}"}} {errors}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _route():
+    # The URL rule template (/addnum/<n1>/<n2>) keeps label cardinality bounded.
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_metrics(app, metrics: Metrics = None) -> Metrics:
+    metrics = metrics if metrics is not None else Metrics()
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            metrics.observe(_route(), request.method, response.status_code, perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def record_failure(error):
+        # Unhandled exceptions skip after_request; they still count, as 500s.
+        start = g.pop('metrics_start', None)
+        if start is not None and error is not None:
+            metrics.observe(_route(), request.method, 500, perf_counter() - start)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
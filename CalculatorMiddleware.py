@@ -0,0 +1,357 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from CalculatorCache import manager_authkey, parse_address
+
+# WSGI middleware for bursty or abusive traffic, installed around the Flask app with
+# install_middleware(app, metrics):
+#
+#   RateLimiter   per-client token bucket (429 + Retry-After) and an optional cap on
+#                 requests in flight (503), so an overload is shed instead of queued
+#   SingleFlight  identical concurrent GETs to an allow-list of small, deterministic routes
+#                 share one execution of the app (only those responses are buffered)
+#
+# Responses answered here never reach the Flask request hooks, so they are recorded in
+# the CalculatorMetrics instance passed to install_middleware.
+#
+# Tuning (environment):
+#   CALCULATOR_RATE=0               tokens added per client per second (0, the default, is off)
+#   CALCULATOR_BURST=100            bucket size
+#   CALCULATOR_MAX_IN_FLIGHT=0      requests handled at once per process before 503s (0 = no cap)
+#   CALCULATOR_COALESCE_WAIT=5      seconds a follower waits for the leader before running itself
+#   CALCULATOR_COALESCE_PATHS=...   comma-separated paths to coalesce; a trailing / matches a
+#                                   prefix (default: the arithmetic routes, empty turns it off)
+#   CALCULATOR_TRUST_PROXY=1        take the client from X-Forwarded-For
+#   CALCULATOR_RATE_ADDRESS=...     share buckets between workers (see serve_bucket_store);
+#                                   needs CALCULATOR_RATE_AUTHKEY on both sides
+# RateLimiter.rate, .burst and .max_in_flight can also be changed on a running app.
+
+COALESCE_VARY = ('HTTP_IF_NONE_MATCH', 'HTTP_ACCEPT_ENCODING', 'HTTP_AUTHORIZATION', 'HTTP_COOKIE')
+COALESCE_PATHS = ('/add', '/addnumwith', '/addnum/', '/subtract/')
+
+
+def route_matcher(app):
+    # Maps a WSGI environ to the Flask URL rule, the label CalculatorMetrics uses.
+    def route(environ) -> str:
+        try:
+            rule, _ = app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except Exception:
+            return 'unmatched'
+        return rule.rule
+    return route
+
+
+def _status_code(status: str) -> int:
+    return int(status.split(' ', 1)[0])
+
+
+class _Flight:
+    __slots__ = ('done', 'status', 'headers', 'body', 'failed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.status = self.headers = self.body = None
+        self.failed = False
+
+
+class SingleFlight:
+    def __init__(self, app, paths=COALESCE_PATHS, wait: float = 5.0, methods=('GET', 'HEAD'),
+                 vary=COALESCE_VARY, metrics=None, route=None):
+        self.app = app
+        self.paths = tuple(paths)
+        self.wait = wait
+        self.methods = methods
+        self.vary = vary
+        self.metrics = metrics
+        self.route = route
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _key(self, environ):
+        return ((environ['REQUEST_METHOD'], environ.get('PATH_INFO', ''), environ.get('QUERY_STRING', ''))
+                + tuple(environ.get(name, '') for name in self.vary))
+
+    def coalesces(self, environ) -> bool:
+        if environ['REQUEST_METHOD'] not in self.methods:
+            return False
+        # A body can change the answer (a JSON "mode" is honoured even on a GET) and isn't
+        # part of the key, so requests carrying one always go through on their own.
+        if environ.get('CONTENT_TYPE') or environ.get('CONTENT_LENGTH', '0') not in ('', '0'):
+            return False
+        path = environ.get('PATH_INFO', '')
+        return any(path == allowed or (allowed.endswith('/') and path.startswith(allowed))
+                   for allowed in self.paths)
+
+    def __call__(self, environ, start_response):
+        if not self.coalesces(environ):
+            return self.app(environ, start_response)
+
+        started = time.perf_counter()
+        key = self._key(environ)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(self.wait) and not flight.failed:
+                with self._lock:
+                    self.coalesced += 1
+                if self.metrics is not None:
+                    self.metrics.observe(self.route(environ), environ['REQUEST_METHOD'],
+                                         _status_code(flight.status), time.perf_counter() - started)
+                start_response(flight.status, list(flight.headers))
+                return [flight.body]
+            # The leader is slow or failed: answer independently rather than queue behind it.
+            return self.app(environ, start_response)
+
+        try:
+            captured = []
+
+            def capture(status, headers, exc_info=None):
+                captured[:] = [status, headers]
+                return lambda data: chunks.append(data)
+
+            chunks = []
+            iterable = self.app(environ, capture)
+            try:
+                chunks.extend(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            flight.status, flight.headers = captured
+            flight.body = b''.join(chunks)
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        start_response(flight.status, list(flight.headers))
+        return [flight.body]
+
+
+class BucketStore:
+    # Token buckets keyed by client: tokens and the time they were last topped up. A full
+    # bucket is the same as no bucket, so idle clients are swept out.
+    def __init__(self, sweep_every: int = 10000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._sweep_every = sweep_every
+        self._calls = 0
+
+    def take(self, client: str, rate: float, burst: float, now: float = None) -> float:
+        # Returns 0 if a token was taken, otherwise the seconds until one is available.
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(client, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[client] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._calls += 1
+            if self._calls >= self._sweep_every:
+                self._calls = 0
+                refill = burst / rate
+                self._buckets = {name: bucket for name, bucket in self._buckets.items()
+                                 if now - bucket[1] < refill}
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class _BucketServer(BaseManager):
+    pass
+
+
+class _BucketClient(BaseManager):
+    pass
+
+
+_BucketClient.register('get_store')
+
+
+def serve_bucket_store(address: str, authkey: bytes):
+    store = BucketStore()
+    _BucketServer.register('get_store', callable=lambda: store)
+    server = _BucketServer(address=parse_address(address), authkey=authkey).get_server()
+    print(f"Shared rate limit store listening on {address}")
+    server.serve_forever()
+
+
+class SharedBucketStore:
+    # Client for serve_bucket_store, connected on first use. If the store is unreachable
+    # requests are let through (a rate limiter outage should not become a Calculator
+    # outage) and the next connect is tried RETRY_AFTER later.
+    RETRY_AFTER = 5.0
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self._authkey = authkey
+        self._store = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        store = self._store
+        if store is not None:
+            return store
+        with self._lock:
+            if self._store is None and time.monotonic() >= self._retry_at:
+                try:
+                    manager = _BucketClient(address=parse_address(self.address), authkey=self._authkey)
+                    manager.connect()
+                    self._store = manager.get_store()
+                except Exception:
+                    self._retry_at = time.monotonic() + self.RETRY_AFTER
+            return self._store
+
+    def take(self, client: str, rate: float, burst: float, now: float = None) -> float:
+        store = self._connect()
+        if store is None:
+            return 0.0
+        try:
+            return store.take(client, rate, burst)
+        except Exception:
+            with self._lock:
+                self._store = None
+                self._retry_at = time.monotonic() + self.RETRY_AFTER
+            return 0.0
+
+
+def _json_error(start_response, status: str, message: str, retry_after: float):
+    body = (json.dumps({'error': message}) + '\n').encode('utf-8')
+    start_response(status, [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body))),
+        ('Retry-After', str(max(1, math.ceil(retry_after))))
+    ])
+    return [body]
+
+
+class _Release:
+    # Wraps a response iterable and runs release() once the server closes it, so a
+    # streamed body keeps its in-flight slot without being buffered.
+    def __init__(self, iterable, release):
+        self._iterable = iterable
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class RateLimiter:
+    def __init__(self, app, store=None, rate: float = 50.0, burst: float = 100.0,
+                 max_in_flight: int = 0, trust_proxy: bool = False, metrics=None, route=None):
+        self.app = app
+        self.store = store if store is not None else BucketStore()
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.trust_proxy = trust_proxy
+        self.metrics = metrics
+        self.route = route
+        self.limited = 0
+        self.shed = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def client(self, environ) -> str:
+        if self.trust_proxy and environ.get('HTTP_X_FORWARDED_FOR'):
+            return environ['HTTP_X_FORWARDED_FOR'].split(',')[0].strip()
+        return environ.get('REMOTE_ADDR', '')
+
+    def _reject(self, environ, start_response, status: str, message: str, retry_after: float, started: float):
+        if self.metrics is not None:
+            self.metrics.observe(self.route(environ), environ['REQUEST_METHOD'],
+                                 _status_code(status), time.perf_counter() - started)
+        return _json_error(start_response, status, message, retry_after)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        if self.rate > 0:
+            wait = self.store.take(self.client(environ), self.rate, self.burst)
+            if wait > 0:
+                with self._lock:
+                    self.limited += 1
+                return self._reject(environ, start_response, '429 Too Many Requests',
+                                    'Too many requests', wait, started)
+
+        if not self.max_in_flight:
+            return self.app(environ, start_response)
+        with self._lock:
+            shed = self._in_flight >= self.max_in_flight
+            if shed:
+                self.shed += 1
+            else:
+                self._in_flight += 1
+        if shed:
+            return self._reject(environ, start_response, '503 Service Unavailable',
+                                'Server is overloaded', 1, started)
+        try:
+            iterable = self.app(environ, start_response)
+        except BaseException:
+            self._release()
+            raise
+        return _Release(iterable, self._release)
+
+
+def install_middleware(app, metrics=None) -> RateLimiter:
+    environ = os.environ
+    route = route_matcher(app)
+    store = None
+    if environ.get('CALCULATOR_RATE_ADDRESS'):
+        store = SharedBucketStore(environ['CALCULATOR_RATE_ADDRESS'], manager_authkey('CALCULATOR_RATE_AUTHKEY'))
+    paths = environ.get('CALCULATOR_COALESCE_PATHS')
+    paths = COALESCE_PATHS if paths is None else [path.strip() for path in paths.split(',') if path.strip()]
+    coalescing = SingleFlight(app.wsgi_app, paths=paths, wait=float(environ.get('CALCULATOR_COALESCE_WAIT', '5')),
+                              metrics=metrics, route=route)
+    limiter = RateLimiter(
+        coalescing,
+        store=store,
+        rate=float(environ.get('CALCULATOR_RATE', '0')),
+        burst=float(environ.get('CALCULATOR_BURST', '100')),
+        max_in_flight=int(environ.get('CALCULATOR_MAX_IN_FLIGHT', '0')),
+        trust_proxy=environ.get('CALCULATOR_TRUST_PROXY', '').lower() in ('1', 'true', 'yes'),
+        metrics=metrics,
+        route=route
+    )
+    app.wsgi_app = limiter
+    return limiter
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shared rate limit buckets for Calculator workers")
+    parser.add_argument('--address', type=str, required=True, help='Unix socket path or host:port to listen on')
+    args = parser.parse_args()
+    try:
+        authkey = manager_authkey('CALCULATOR_RATE_AUTHKEY')
+    except RuntimeError as error:
+        parser.error(str(error))
+    serve_bucket_store(args.address, authkey)
@@ -0,0 +1,158 @@
+import os
+import re
+import timeit
+from decimal import Context, Decimal, DecimalException
+from fractions import Fraction
+
+# Numeric modes for the Calculator routes. The mode comes from the request (?mode=decimal
+# or "mode" in a JSON body) or, failing that, from the deployment:
+#
+#   CALCULATOR_NUMERIC_MODE=decimal   int | float | decimal | fraction (default float)
+#   CALCULATOR_DECIMAL_PRECISION=50   significant digits kept by decimal mode
+#   CALCULATOR_MAX_DIGITS=1000        longest operand text accepted
+#   CALCULATOR_MAX_EXPONENT=1000      largest |exponent| accepted ("1e1000")
+#
+# Decimal and fraction operands are parsed straight from the text, never through float, so
+# "0.1" + "0.2" is exactly 0.3. Integer-only operands take a fast path on plain int in
+# every exact mode. calculate() is the framework-free core of the arithmetic routes,
+# shared by Calculator.py and CalculatorASGI.py so the two entry points answer alike.
+# Operand length and exponent are capped before any of that, so a request can't make
+# Fraction build a billion-digit integer.
+#
+#   python CalculatorNumeric.py       (times each mode)
+
+MODES = ('int', 'float', 'decimal', 'fraction')
+DEFAULT_MODE = os.environ.get('CALCULATOR_NUMERIC_MODE', 'float')
+DECIMAL_CONTEXT = Context(prec=int(os.environ.get('CALCULATOR_DECIMAL_PRECISION', '50')))
+MAX_DIGITS = int(os.environ.get('CALCULATOR_MAX_DIGITS', '1000'))
+MAX_EXPONENT = int(os.environ.get('CALCULATOR_MAX_EXPONENT', '1000'))
+EXPONENT = re.compile(r'[eE]([+-]?[0-9_]+)\s*$')
+
+if DEFAULT_MODE not in MODES:
+    raise ValueError(f"CALCULATOR_NUMERIC_MODE must be one of {', '.join(MODES)}, not {DEFAULT_MODE!r}")
+
+
+def parse_mode(mode, default: str = None) -> str:
+    if mode is None:
+        return default or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown numeric mode {mode!r}; use one of {', '.join(MODES)}")
+    return mode
+
+
+def requested_mode(args: dict, data=None):
+    # ?mode= wins over "mode" in a JSON body; None if neither is given.
+    mode = args.get('mode')
+    if mode is None and isinstance(data, dict):
+        mode = data.get('mode')
+    return mode
+
+
+def request_mode(default: str = None) -> str:
+    # Imported here so CalculatorASGI can use this module without Flask.
+    from flask import request
+
+    data = request.get_json(silent=True) if request.is_json else None
+    return parse_mode(requested_mode(request.args, data), default)
+
+
+def check_size(text: str):
+    if len(text) > MAX_DIGITS:
+        raise ValueError(f"Operands are limited to {MAX_DIGITS} characters")
+    exponent = EXPONENT.search(text)
+    if exponent is not None and abs(int(exponent.group(1).replace('_', '') or '0')) > MAX_EXPONENT:
+        raise ValueError(f"Exponents are limited to {MAX_EXPONENT}")
+
+
+def parse(value, mode: str):
+    if type(value) is str:
+        check_size(value)
+    if mode == 'float':
+        return float(value)
+    if type(value) is int:
+        return value
+    if type(value) is str and (value.isdigit() or value[1:].isdigit()) and value.isascii():
+        return int(value)
+    if mode == 'int':
+        if type(value) is float and value.is_integer():
+            return int(value)
+        if type(value) is str:
+            return int(value)
+        raise ValueError(f"{value!r} is not an integer")
+    # JSON numbers arrive as floats; their repr is the shortest text that round-trips,
+    # which is what the client wrote for any value with up to 15 significant digits.
+    text = repr(value) if type(value) is float else value
+    if not isinstance(text, str):
+        raise ValueError(f"{value!r} is not a number")
+    try:
+        number = Decimal(text) if mode == 'decimal' else Fraction(text)
+    except (DecimalException, ZeroDivisionError) as error:
+        raise ValueError(f"{value!r} is not a number") from error
+    if mode == 'decimal' and not number.is_finite():
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+def add(num1, num2, mode: str):
+    a, b = parse(num1, mode), parse(num2, mode)
+    try:
+        if type(a) is Decimal or type(b) is Decimal:
+            return DECIMAL_CONTEXT.add(a, b)
+        return a + b
+    except ArithmeticError as error:
+        raise ValueError("The result is out of range") from error
+
+
+def subtract(num1, num2, mode: str):
+    a, b = parse(num1, mode), parse(num2, mode)
+    try:
+        if type(a) is Decimal or type(b) is Decimal:
+            return DECIMAL_CONTEXT.subtract(a, b)
+        return a - b
+    except ArithmeticError as error:
+        raise ValueError("The result is out of range") from error
+
+
+def calculate(operation, num1, num2, mode, default_mode: str = None):
+    # operation is add or subtract; mode is the raw requested mode (or None). Returns
+    # (result, None) with the result ready for JSON, or (None, message) for a 400.
+    if num1 is None or num2 is None:
+        return None, 'Please provide both num1 and num2'
+    try:
+        mode = parse_mode(mode, default_mode)
+    except ValueError as error:
+        return None, str(error)
+    try:
+        return to_json(operation(num1, num2, mode), mode), None
+    except (TypeError, ValueError):
+        return None, 'Both num1 and num2 must be numbers'
+
+
+def to_json(value, mode: str):
+    # Exact modes are returned as strings so JSON clients do not round them through a double.
+    if mode in ('int', 'float'):
+        return value
+    if type(value) is Decimal:
+        return format(value, 'f')
+    return str(value)
+
+
+def benchmark(number: int = 200000):
+    cases = {
+        'integers': ('17', '25'),
+        'decimals': ('1234.56', '0.01'),
+        'json floats': (1234.56, 0.01)
+    }
+    for case, (num1, num2) in cases.items():
+        for mode in MODES:
+            try:
+                add(num1, num2, mode)
+            except ValueError:
+                print(f"{mode:<9} {case:<12} {'n/a':>10}")
+                continue
+            seconds = timeit.timeit(lambda: add(num1, num2, mode), number=number)
+            print(f"{mode:<9} {case:<12} {seconds / number * 1e9:>10,.0f} ns/add  = {to_json(add(num1, num2, mode), mode)}")
+
+
+if __name__ == '__main__':
+    benchmark()
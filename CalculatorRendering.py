@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, current_app, make_response, render_template, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Production rendering for the Calculator pages and static files. Turned on with
+# CALCULATOR_PRODUCTION=1 (or init_rendering(app, production=True)):
+#   - templates are compiled once at startup and never re-checked for changes;
+#   - static pages (render_page) are rendered once, kept with gzip and brotli copies,
+#     and answered from memory with an ETag, so a repeat visit gets a 304;
+#   - files under static/ are loaded and compressed at startup and served the same way.
+# Without it, render_page is just render_template and static files use Flask's own view.
+
+PAGE_CACHE_CONTROL = 'no-cache'
+STATIC_CACHE_CONTROL = 'public, max-age=3600'
+MAX_STATIC_SIZE = 1024 * 1024
+COMPRESS_MIN_SIZE = 256
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+
+
+class Asset:
+    __slots__ = ('body', 'gzip', 'br', 'etag', 'mimetype')
+
+    def __init__(self, body: bytes, mimetype: str):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.gzip = self.br = None
+        if len(body) >= COMPRESS_MIN_SIZE and mimetype.startswith(COMPRESSIBLE):
+            compressed = gzip.compress(body, 9, mtime=0)
+            self.gzip = compressed if len(compressed) < len(body) else None
+            if brotli is not None:
+                compressed = brotli.compress(body)
+                self.br = compressed if len(compressed) < len(body) else None
+
+    def response(self, cache_control: str) -> Response:
+        if request.if_none_match.contains_weak(self.etag):
+            response = make_response('', 304)
+        elif self.br is not None and request.accept_encodings['br']:
+            response = Response(self.br, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = 'br'
+        elif self.gzip is not None and request.accept_encodings['gzip']:
+            response = Response(self.gzip, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype=self.mimetype)
+        # Every encoding shares one weak ETag: they are the same content.
+        response.set_etag(self.etag, weak=True)
+        response.headers['Cache-Control'] = cache_control
+        if self.gzip is not None or self.br is not None:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class Renderer:
+    def __init__(self, app, production: bool):
+        self.production = production
+        self.pages = {}
+        self.static = {}
+        self._lock = threading.Lock()
+        if production:
+            self._precompile(app)
+            self._load_static(app)
+
+    def _precompile(self, app):
+        app.config['TEMPLATES_AUTO_RELOAD'] = False
+        app.jinja_env.auto_reload = False
+        templates = app.jinja_env.list_templates() if app.jinja_loader is not None else []
+        for name in templates:
+            app.jinja_env.get_template(name)
+        print(f"Precompiled {len(templates)} templates")
+
+    def _load_static(self, app):
+        folder = app.static_folder
+        if not folder or not os.path.isdir(folder):
+            return
+        for root, _, files in os.walk(folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if os.path.getsize(path) > MAX_STATIC_SIZE:
+                    continue
+                with open(path, 'rb') as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                self.static[os.path.relpath(path, folder).replace(os.sep, '/')] = Asset(body, mimetype)
+        app.view_functions['static'] = self.serve_static
+        print(f"Loaded {len(self.static)} static files")
+
+    def render_page(self, template: str, **context):
+        # Only for pages whose output depends on nothing but the template and context.
+        if not self.production:
+            return render_template(template, **context)
+        key = (template, tuple(sorted(context.items())))
+        asset = self.pages.get(key)
+        if asset is None:
+            with self._lock:
+                asset = self.pages.get(key)
+                if asset is None:
+                    body = render_template(template, **context).encode('utf-8')
+                    asset = self.pages[key] = Asset(body, 'text/html')
+        return asset.response(PAGE_CACHE_CONTROL)
+
+    def serve_static(self, filename: str):
+        asset = self.static.get(filename)
+        if asset is None:
+            # Files too large to keep in memory, or added after startup.
+            return send_from_directory(current_app.static_folder, filename)
+        return asset.response(STATIC_CACHE_CONTROL)
+
+
+def init_rendering(app, production: bool = None) -> Renderer:
+    if production is None:
+        production = os.environ.get('CALCULATOR_PRODUCTION', '').lower() in ('1', 'true', 'yes')
+    return Renderer(app, production)
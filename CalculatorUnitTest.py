@@ -0,0 +1,419 @@
+import asyncio
+import gzip
+import json
+import math
+import os
+import threading
+import time
+import unittest
+from array import array
+from unittest.mock import patch
+from flask import Flask
+from jinja2 import DictLoader
+import Calculator
+import CalculatorASGI
+import CalculatorBatch
+import CalculatorBenchmark
+import CalculatorCache
+import CalculatorNumeric
+from CalculatorCatalogue import Catalogue, encode_cursor
+from CalculatorCache import LRUCache, SharedCache, create_cache
+from CalculatorExpression import ExpressionCache, ExpressionError, normalise
+from CalculatorMetrics import BUCKETS, Metrics, init_metrics
+from CalculatorRendering import init_rendering
+from CalculatorMiddleware import BucketStore, SingleFlight, install_middleware
+
+class CalculatorTestCase(unittest.TestCase):
+    def setUp(self):
+        Calculator.app.config['TESTING'] = True
+        self.client = Calculator.app.test_client()
+
+class TestResultCache(CalculatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = patch.object(CalculatorCache, 'result_cache', LRUCache(100))
+        self.cache.start()
+
+    def tearDown(self):
+        self.cache.stop()
+
+    def test_etag_and_304(self):
+        response = self.client.get('/add?num1=1&num2=2')
+        self.assertEqual(response.get_json(), {'result': 3.0})
+        etag = response.headers['ETag']
+        again = self.client.get('/add?num1=1.0&num2=2', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+    def test_post_responses_carry_no_cache_headers(self):
+        etag = self.client.get('/add?num1=1&num2=2').headers['ETag']
+        for _ in range(2):
+            response = self.client.post('/addnumpost', json={'num1': 1, 'num2': 2},
+                                        headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response.headers)
+            self.assertNotIn('Cache-Control', response.headers)
+
+    def test_negative_zero_has_its_own_entry(self):
+        self.assertEqual(self.client.get('/add?num1=-0&num2=-0').get_data(as_text=True).strip(),
+                         '{"result":-0.0}')
+        self.assertEqual(self.client.get('/add?num1=0&num2=0').get_data(as_text=True).strip(),
+                         '{"result":0.0}')
+
+    def test_shared_cache_requires_authkey(self):
+        with patch.dict(os.environ, {'CALCULATOR_CACHE_ADDRESS': '127.0.0.1:1'}):
+            os.environ.pop('CALCULATOR_CACHE_AUTHKEY', None)
+            with self.assertRaises(RuntimeError):
+                create_cache()
+
+    def test_unreachable_shared_cache_is_a_miss(self):
+        cache = SharedCache('/nonexistent/calculator-cache.sock', b'secret')
+        self.assertIsNone(cache.get(('add', '1', '2')))
+        cache.set(('add', '1', '2'), (b'3', 'text/html', 'etag'))
+        self.assertIsNone(cache.get(('add', '1', '2')))
+
+class TestBatch(CalculatorTestCase):
+    OPERATIONS = [{'op': 'add', 'num1': 1, 'num2': 2}, {'op': 'subtract', 'num1': 1, 'num2': 2.5},
+                  {'op': 'multiply', 'num1': '3', 'num2': 4}, {'op': 'divide', 'num1': 1, 'num2': 0}]
+
+    def test_json_batch(self):
+        response = self.client.post('/batch', json={'operations': self.OPERATIONS})
+        self.assertEqual(response.get_json(), {'results': [3.0, -1.5, 12.0, None]})
+        self.assertEqual(self.client.post('/batch', json=self.OPERATIONS[:1]).get_json(), {'results': [3.0]})
+
+    def test_invalid_batches(self):
+        for payload in ({'operations': 'add'}, [{'op': 'power', 'num1': 1, 'num2': 2}], [{'op': 'add', 'num1': 1}]):
+            self.assertEqual(self.client.post('/batch', json=payload).status_code, 400)
+        response = self.client.post('/batch', json=self.OPERATIONS + [{'op': 'add', 'num1': 'x', 'num2': 1}])
+        self.assertIn('Operation 4', response.get_json()['error'])
+        response = self.client.post('/batch', data=b'\x00' * 5, content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400)
+
+    def test_binary_batch(self):
+        body = b''.join(CalculatorBatch.RECORD.pack(CalculatorBatch.OP_CODES[operation['op']],
+                                                    float(operation['num1']), float(operation['num2']))
+                        for operation in self.OPERATIONS)
+        response = self.client.post('/batch', data=body, content_type='application/octet-stream')
+        results = array('d', response.get_data())
+        self.assertEqual(list(results[:3]), [3.0, -1.5, 12.0])
+        self.assertTrue(math.isnan(results[3]))
+        bad = CalculatorBatch.RECORD.pack(9, 1.0, 2.0)
+        self.assertEqual(self.client.post('/batch', data=bad, content_type='application/octet-stream').status_code, 400)
+
+    def test_without_numpy(self):
+        with patch.object(CalculatorBatch, 'np', None):
+            codes, num1, num2 = CalculatorBatch.parse_json_operations(self.OPERATIONS)
+            results = CalculatorBatch.evaluate(codes, num1, num2)
+            self.assertEqual(''.join(CalculatorBatch.iter_json_results(results)), '{"results":[3.0,-1.5,12.0,null]}')
+            codes, num1, num2 = CalculatorBatch.parse_binary_operations(CalculatorBatch.RECORD.pack(0, 1.0, 2.0))
+            self.assertEqual(b''.join(CalculatorBatch.iter_binary_results(CalculatorBatch.evaluate(codes, num1, num2))),
+                             array('d', [3.0]).tobytes())
+
+class TestExpressions(CalculatorTestCase):
+    def test_eval(self):
+        self.assertEqual(self.client.get('/eval?expr=2*(x%2B1)&x=3').get_json(), {'result': 8.0})
+        response = self.client.post('/eval', json={'expression': '1/0'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'error': 'Division by zero'})
+
+    def test_normalise_keeps_invalid_text_invalid(self):
+        self.assertEqual(normalise('a * (b+1)'), normalise('a*(b + 1)'))
+        self.assertEqual(normalise('1e-5'), '1e-5')
+        self.assertNotEqual(normalise('1e - 5'), normalise('1e-5'))
+        cache = ExpressionCache()
+        self.assertEqual(cache.evaluate('1e-5'), 1e-5)
+        with self.assertRaises(ExpressionError):
+            cache.evaluate('1e - 5')
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_limits(self):
+        cache = ExpressionCache()
+        for text in ('(' * 200 + '1' + ')' * 200, '-' * 200 + '1', '1+' * 600 + '1', '9' * 400 + '/3'):
+            with self.assertRaises(ExpressionError):
+                cache.evaluate(text)
+        self.assertEqual(cache.evaluate('(' * 50 + '1' + ')' * 50), 1)
+        self.assertEqual(self.client.get('/eval?expr=' + '(' * 5000).status_code, 400)
+
+    def test_out_of_range_results_are_a_400(self):
+        huge = '1' + '0' * 400
+        for query in (f'expr={huge}%2B0.5', f'expr={huge}*x&x=2', 'expr=1e308*10', 'expr=1e308*10-1e308*10',
+                      'expr=x*x&x=1e200'):
+            with self.subTest(query=query):
+                response = self.client.get('/eval?' + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json(), {'error': 'The result is out of range'})
+        self.assertEqual(self.client.get(f'/eval?expr={huge}-{huge}').get_json(), {'result': 0})
+
+    def test_malformed_json_bodies_are_a_400(self):
+        for payload in (['1+1'], {'expression': 'a+1', 'variables': ['a']}):
+            self.assertEqual(self.client.post('/eval', json=payload).status_code, 400)
+
+class TestNumericModes(CalculatorTestCase):
+    def test_exact_modes(self):
+        self.assertEqual(CalculatorNumeric.add('0.1', '0.2', 'decimal'), CalculatorNumeric.parse('0.3', 'decimal'))
+        self.assertEqual(CalculatorNumeric.to_json(CalculatorNumeric.add('1/3', '1/6', 'fraction'), 'fraction'), '1/2')
+        self.assertEqual(CalculatorNumeric.add('17', '25', 'int'), 42)
+        self.assertEqual(self.client.get('/add?num1=0.1&num2=0.2&mode=decimal').get_json(), {'result': '0.3'})
+
+    def test_huge_operands_are_rejected_quickly(self):
+        for value in ('1e999999999', '1e-999999999', '1' * 5000):
+            for mode in CalculatorNumeric.MODES:
+                with self.assertRaises(ValueError):
+                    CalculatorNumeric.parse(value, mode)
+        self.assertEqual(self.client.get('/add?num1=1e999999999&num2=1&mode=fraction').status_code, 400)
+
+    def test_overflow_is_a_value_error(self):
+        with patch.object(CalculatorNumeric, 'MAX_EXPONENT', 10 ** 9):
+            with self.assertRaises(ValueError):
+                CalculatorNumeric.add('9e999999', '9e999999', 'decimal')
+
+    def test_bad_mode_is_a_400(self):
+        for path in ('/addnum/1/2?mode=bogus', '/subtract/1/2?mode=bogus', '/add?num1=1&num2=2&mode=bogus'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('bogus', response.get_json()['error'])
+        self.assertEqual(self.client.get('/addnum/1/2?mode=decimal').get_data(as_text=True), '3')
+
+class TestASGIParity(CalculatorTestCase):
+    REQUESTS = [
+        ('GET', '/addnum/17/25', None),
+        ('GET', '/addnum/1/2?mode=bogus', None),
+        ('GET', '/addnum/a/b', None),
+        ('GET', '/subtract/5/7?mode=decimal', None),
+        ('GET', '/add?num1=0.1&num2=0.2&mode=decimal', None),
+        ('GET', '/add?num1=1', None),
+        ('GET', '/add?num1=x&num2=1', None),
+        ('GET', '/addnumwith?num1=1&num2=2&mode=fraction', None),
+        ('GET', '/addnumwith?num1=1&num2=2&mode=bogus', None),
+        ('POST', '/addnumpost', {'num1': [1], 'num2': 2}),
+        ('POST', '/addnumpost', {'num1': '1/3', 'num2': '1/6', 'mode': 'fraction'}),
+        ('POST', '/addnumpost?mode=decimal', {'num1': '0.1', 'num2': '0.2', 'mode': 'fraction'})
+    ]
+
+    def asgi(self, method, target, payload):
+        path, _, query = target.partition('?')
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('latin-1'),
+                 'headers': [(b'content-type', b'application/json')] if payload is not None else []}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(CalculatorASGI.app(scope, receive, send))
+        return sent[0]['status'], sent[1]['body']
+
+    def test_same_responses_as_flask(self):
+        for method, target, payload in self.REQUESTS:
+            with self.subTest(target=target, payload=payload):
+                response = self.client.open(target, method=method, json=payload)
+                status, body = self.asgi(method, target, payload)
+                self.assertEqual(status, response.status_code)
+                if response.is_json:
+                    self.assertEqual(json.loads(body), response.get_json())
+                else:
+                    self.assertEqual(body, response.get_data())
+
+class TestCatalogue(CalculatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.catalogue = Catalogue([{'name': f'item{i % 3}', 'price': i % 7} for i in range(20)])
+
+    def test_paging(self):
+        seen = []
+        cursor = None
+        while True:
+            products, cursor = self.catalogue.page(limit=6, cursor=cursor)
+            seen.extend(products)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 20)
+        products, cursor = self.catalogue.page(name='item1', min_price=2, max_price=4, limit=2)
+        self.assertEqual([product['price'] for product in products], [2, 3])
+        products, _ = self.catalogue.page(name='item1', min_price=2, max_price=4, limit=2, cursor=cursor)
+        self.assertEqual([product['price'] for product in products], [4])
+        response = self.client.get('/products?name=bats')
+        self.assertEqual(response.get_json(), {'products': [{'name': 'bats', 'price': 40}], 'next_cursor': None})
+
+    def test_invalid_cursors_are_rejected(self):
+        for cursor, by_price in ((-5, False), (True, False), ([1, -1], True), ([float('nan'), 1], True), ('x', False)):
+            with self.assertRaises(ValueError):
+                self.catalogue.page(min_price=0 if by_price else None, cursor=encode_cursor(cursor))
+        response = self.client.get('/products?cursor=' + encode_cursor(-1))
+        self.assertEqual(response.status_code, 400)
+
+class TestRendering(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.jinja_env.loader = DictLoader({'index.html': '<p>{{ "Calculator " * 40 }}</p>'})
+        renderer = init_rendering(app, production=True)
+        app.add_url_rule('/', 'home', lambda: renderer.render_page('index.html'))
+        self.renderer = renderer
+        self.client = app.test_client()
+
+    def test_page_rendered_once_and_compressed(self):
+        response = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip.decompress(response.get_data()).startswith(b'<p>Calculator'))
+        self.assertEqual(len(self.renderer.pages), 1)
+        plain = self.client.get('/')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.headers['Vary'], 'Accept-Encoding')
+
+    def test_etag_and_304(self):
+        etag = self.client.get('/').headers['ETag']
+        self.assertEqual(self.client.get('/', headers={'If-None-Match': etag}).status_code, 304)
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        self.metrics = init_metrics(app)
+        app.add_url_rule('/addnum/<n1>/<n2>', 'add', lambda n1, n2: str(int(n1) + int(n2)))
+        app.config['TESTING'] = False
+        self.client = app.test_client()
+
+    def samples(self):
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertTrue(text.endswith('\n'))
+        samples = {}
+        for line in text.splitlines():
+            if line.startswith('#'):
+                self.assertRegex(line, r'^# (HELP|TYPE) calculator_\w+ ')
+                continue
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+        return samples
+
+    def test_prometheus_format(self):
+        for path in ('/addnum/1/2', '/addnum/3/4', '/addnum/x/4'):
+            self.client.get(path)
+        samples = self.samples()
+        labels = 'route="/addnum/<n1>/<n2>",method="GET"'
+        self.assertEqual(samples[f'calculator_request_duration_seconds_count{{{labels}}}'], 3)
+        self.assertEqual(samples[f'calculator_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], 3)
+        buckets = [samples[f'calculator_request_duration_seconds_bucket{{{labels},le="{bound}"}}'] for bound in BUCKETS]
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertGreater(samples[f'calculator_request_duration_seconds_sum{{{labels}}}'], 0)
+        self.assertEqual(samples[f'calculator_requests_total{{{labels},status="200"}}'], 2)
+        self.assertEqual(samples[f'calculator_requests_total{{{labels},status="500"}}'], 1)
+        self.assertEqual(samples[f'calculator_request_errors_total{{{labels}}}'], 1)
+
+    def test_unmatched_routes_and_escaping(self):
+        self.client.get('/missing')
+        self.assertEqual(self.samples()['calculator_requests_total{route="unmatched",method="GET",status="404"}'], 1)
+        metrics = Metrics()
+        metrics.observe('a"b\\c', 'GET', 200, 0.001)
+        self.assertIn('route="a\\"b\\\\c"', metrics.render())
+
+class TestRateLimiter(CalculatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.limiter = patch.multiple(Calculator.limiter, store=BucketStore(), rate=0.001, burst=2)
+        self.limiter.start()
+
+    def tearDown(self):
+        self.limiter.stop()
+
+    def test_token_bucket(self):
+        store = BucketStore()
+        self.assertEqual(store.take('a', 1.0, 2, now=0.0), 0.0)
+        self.assertEqual(store.take('a', 1.0, 2, now=0.0), 0.0)
+        self.assertEqual(store.take('a', 1.0, 2, now=0.0), 1.0)
+        self.assertEqual(store.take('b', 1.0, 2, now=0.0), 0.0)
+        self.assertEqual(store.take('a', 1.0, 2, now=0.5), 0.5)
+        self.assertEqual(store.take('a', 1.0, 2, now=1.0), 0.0)
+
+    def test_rejections_are_counted_in_metrics(self):
+        statuses = [self.client.get('/addnum/1/2').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        rejected = self.client.get('/addnum/1/2')
+        self.assertEqual(rejected.get_json(), {'error': 'Too many requests'})
+        self.assertIn('Retry-After', rejected.headers)
+        self.assertEqual(Calculator.limiter.limited, 2)
+        self.assertIn('calculator_requests_total{route="/addnum/<n1>/<n2>",method="GET",status="429"} 2',
+                      Calculator.metrics.render())
+
+    def test_shared_store_requires_authkey(self):
+        with patch.dict(os.environ, {'CALCULATOR_RATE_ADDRESS': '127.0.0.1:1'}):
+            os.environ.pop('CALCULATOR_RATE_AUTHKEY', None)
+            with self.assertRaises(RuntimeError):
+                install_middleware(Calculator.app)
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.release = threading.Event()
+
+        def app(environ, start_response):
+            self.calls.append(environ['PATH_INFO'])
+            self.release.wait(5)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'3']
+
+        self.metrics = Metrics()
+        self.flight = SingleFlight(app, metrics=self.metrics, route=lambda environ: environ['PATH_INFO'])
+
+    def request(self, path, results, **extra):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', **extra}
+        results.append(b''.join(self.flight(environ, lambda status, headers: None)))
+
+    def run_concurrently(self, path, count, **extra):
+        results = []
+        threads = [threading.Thread(target=self.request, args=(path, results), kwargs=extra)
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_requests_share_one_call(self):
+        self.assertEqual(self.run_concurrently('/addnum/1/2', 5), [b'3'] * 5)
+        self.assertEqual(self.calls, ['/addnum/1/2'])
+        self.assertEqual(self.flight.coalesced, 4)
+        self.assertIn('calculator_requests_total{route="/addnum/1/2",method="GET",status="200"} 4',
+                      self.metrics.render())
+
+    def test_routes_off_the_allow_list_are_not_coalesced(self):
+        self.assertEqual(self.run_concurrently('/products', 3), [b'3'] * 3)
+        self.assertEqual(self.calls, ['/products'] * 3)
+        self.assertEqual(self.flight.coalesced, 0)
+
+    def test_requests_with_a_body_are_not_coalesced(self):
+        self.assertEqual(self.run_concurrently('/addnum/1/2', 3, CONTENT_TYPE='application/json',
+                                               CONTENT_LENGTH='18'), [b'3'] * 3)
+        self.assertEqual(self.calls, ['/addnum/1/2'] * 3)
+        self.assertEqual(self.flight.coalesced, 0)
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def stats(self, requests_per_second, p99_ms):
+        return {'requests_per_second': requests_per_second, 'p99_ms': p99_ms}
+
+    def test_variants(self):
+        self.assertEqual(CalculatorBenchmark.variants('addnum', 2),
+                         [('GET', '/addnum/0/25', None), ('GET', '/addnum/1/25', None)])
+        self.assertEqual(CalculatorBenchmark.variants('addnumpost', 2)[1],
+                         ('POST', '/addnumpost', {'num1': 1.5, 'num2': 2.25}))
+
+    def test_compare(self):
+        baseline = {'test-client': {'add': {'1': self.stats(1000, 1.0), '8': self.stats(4000, 2.0)}}}
+        results = {'test-client': {'add': {'1': self.stats(900, 1.1), '8': self.stats(3000, 2.5), '32': self.stats(1, 99)}}}
+        regressions = CalculatorBenchmark.compare(results, baseline, 0.15)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(regression.startswith('test-client add c=8') for regression in regressions))
+        self.assertEqual(CalculatorBenchmark.compare(results, {}, 0.15), [])
+
+    def test_every_route_answers_through_the_test_client(self):
+        for route in CalculatorBenchmark.REQUESTS:
+            stats = CalculatorBenchmark.run_test_client(route, 2, 0.05, 3)
+            self.assertGreater(stats['requests'], 0)
+            self.assertEqual(stats['errors'], 0)
+        allocations = CalculatorBenchmark.measure_allocations('add', 5, 3)
+        self.assertGreater(allocations['peak_bytes_per_request'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
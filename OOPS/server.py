@@ -1,11 +1,25 @@
 class Server:
     def __init__(self, ipAddress, port, status, uptime, downtime):
+        # set by ServerFleet.add so status changes keep the fleet's indexes current
+        self.fleet = None
         self.ipAddress = ipAddress
         self.port = port
         self.status = status
         self.uptime = uptime
         self.downtime = downtime
 
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        fleet = self.fleet
+        if fleet is None:
+            self._status = value
+        else:
+            fleet.set_status(self, value)
+
     def displayServerInformation(self):
         print("ipAddrss:", self.ipAddress)
         print("Status:", self.status)
@@ -21,9 +35,10 @@ class Server:
             print("Error: othe server is already offline")
 
 
-testServer = Server("120.34.0.1", 3000, "Offline", 8, 20)
-testServer.start()
-testServer.stop()
+if __name__ == "__main__":
+    testServer = Server("120.34.0.1", 3000, "Offline", 8, 20)
+    testServer.start()
+    testServer.stop()
 
 # inheritance
 
@@ -31,7 +46,7 @@ testServer.stop()
 class Webserver(Server):
     def __init__(self, ipAddress, port, status, uptime, downtime, domain):
         # calling the init function of the server class
-        super.__init__(ipAddress, port, status, uptime, downtime)
+        super().__init__(ipAddress, port, status, uptime, downtime)
         self.domain = domain
 
     def displayServerInformation(self):
@@ -43,7 +58,7 @@ class Webserver(Server):
 class Databaseserver(Server):
     def __init__(self, ipAddress, port, status, uptime, downtime, databaseURL):
         # calling the init function of the server class
-        super.__init__(ipAddress, port, status, uptime, downtime)
+        super().__init__(ipAddress, port, status, uptime, downtime)
         self.databaseURL = databaseURL
 
     def displayServerInformation(self):
@@ -54,4 +69,5 @@ class Databaseserver(Server):
 
 # same function can have multiple implementation in a parent child relationship
 
-webserver1 = Webserver("localhost", 5000, "Offline", 8, 20, "Google.com")
+if __name__ == "__main__":
+    webserver1 = Webserver("localhost", 5000, "Offline", 8, 20, "Google.com")
@@ -0,0 +1,244 @@
+import asyncio
+import socket
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import numpy as np
+from server import Server, Webserver
+from fleet import ServerFleet
+from fleetstore import FleetStore
+from orchestration import FakeBackend, rolling_operation, start_all
+from analytics import fleet_columns, fleet_report, series_report
+from healthcheck import HealthChecker
+
+class TestServerFleet(unittest.TestCase):
+    def setUp(self):
+        self.web1 = Webserver("10.0.0.1", 80, "Offline", 8, 20, "example.com")
+        self.web2 = Webserver("10.0.0.2", 80, "online", 8, 20, "example.com")
+        self.server = Server("10.0.0.3", 5432, "offline", 8, 20)
+        self.fleet = ServerFleet([self.web1, self.web2, self.server])
+
+    def test_lookups(self):
+        self.assertIs(self.fleet.get("10.0.0.3", 5432), self.server)
+        self.assertIsNone(self.fleet.get("10.0.0.3", 80))
+        self.assertEqual(self.fleet.with_domain("example.com"), [self.web1, self.web2])
+        self.assertEqual(self.fleet.offline(), [self.web1, self.server])
+        self.assertEqual(self.fleet.status_counts(), {'offline': 2, 'online': 1})
+        with self.assertRaises(ValueError):
+            self.fleet.add(Server("10.0.0.3", 5432, "online", 0, 0))
+
+    def test_start_stop_update_status_index(self):
+        with redirect_stdout(StringIO()):
+            self.web1.start()
+            self.web2.stop()
+        self.assertEqual(self.fleet.online(), [self.web1])
+        self.assertEqual(self.fleet.offline(), [self.server, self.web2])
+        self.fleet.remove("10.0.0.1", 80)
+        self.assertEqual(self.fleet.online(), [])
+        self.assertEqual(self.fleet.with_domain("example.com"), [self.web2])
+        self.web1.stop()
+        self.assertEqual(len(self.fleet), 2)
+
+    def test_concurrent_status_changes_keep_one_index_entry(self):
+        def flip(status):
+            for _ in range(2000):
+                self.server.status = status
+        threads = [threading.Thread(target=flip, args=(status,)) for status in ("online", "offline") * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        indexed = [status for status in ("online", "offline") if self.server in self.fleet.with_status(status)]
+        self.assertEqual(indexed, [self.server.status])
+
+class TestFleetStore(unittest.TestCase):
+    def test_views_write_through(self):
+        store = FleetStore()
+        store.add(Webserver("localhost", 5000, "Offline", 8, 20, "example.com"))
+        store.add(Server("10.0.0.3", 5432, "online", 1.5, 2))
+        web, server = store
+        self.assertIsInstance(web, Webserver)
+        self.assertEqual((web.ipAddress, web.port, web.domain), ("localhost", 5000, "example.com"))
+        self.assertEqual((server.ipAddress, server.uptime), ("10.0.0.3", 1.5))
+        with redirect_stdout(StringIO()):
+            web.start()
+            server.stop()
+        self.assertEqual(store[0].status, "online")
+        self.assertEqual([view.port for view in store.with_status("offline")], [5432])
+        self.assertEqual(store.port.typecode, 'H')
+
+    def test_status_is_case_insensitive(self):
+        store = FleetStore()
+        store.add(Server("10.0.0.1", 80, "Offline", 0, 0))
+        store.add(Server("10.0.0.2", 80, "OFFLINE", 0, 0))
+        store.add(Server("10.0.0.3", 80, "Online", 0, 0))
+        self.assertEqual(len(store.statuses.values), 2)
+        self.assertEqual([view.port for view in store.with_status("Offline")], [80, 80])
+        store[2].status = "OFFLINE"
+        self.assertEqual(store.indexes_with_status("offline"), [0, 1, 2])
+        self.assertEqual(store[0].status, "offline")
+
+    def test_addresses_are_parsed_strictly(self):
+        store = FleetStore()
+        store.add(Server("10.1.1.1", 80, "online", 0, 0))
+        store.add(Server("localhost", 80, "online", 0, 0))
+        self.assertEqual([view.ipAddress for view in store], ["10.1.1.1", "localhost"])
+        for address in ("010.1.1.1", "10.1.1.256"):
+            with self.assertRaises(ValueError):
+                store.add(Server(address, 80, "online", 0, 0))
+        self.assertEqual(len(store), 2)
+
+class TestOrchestration(unittest.TestCase):
+    def setUp(self):
+        self.servers = [Server(f"10.0.1.{i}", 80, "offline", 0, 0) for i in range(100)]
+        self.fleet = ServerFleet(self.servers)
+
+    def test_start_all_in_waves(self):
+        backend = FakeBackend(default_delay=0.001)
+        result = start_all(self.fleet, action=backend, concurrency=16)
+        self.assertEqual(result.waves, [1, 9, 90])
+        self.assertEqual(len(result.succeeded), 100)
+        self.assertEqual(len(self.fleet.online()), 100)
+        self.assertEqual(len(backend.calls), 100)
+
+    def test_failure_halts_rollout(self):
+        backend = FakeBackend(failures={("10.0.1.4", 80)}, delays={("10.0.1.2", 80): 5})
+        result = rolling_operation(self.servers, "start", action=backend, timeout=0.05)
+        self.assertTrue(result.halted)
+        self.assertEqual(result.waves, [1, 9])
+        self.assertEqual(result.skipped, 90)
+        self.assertEqual([r.server.ipAddress for r in result.timed_out], ["10.0.1.2"])
+        self.assertEqual(len(result.failed), 2)
+        self.assertEqual(len(self.fleet.online()), 8)
+
+class TestAnalytics(unittest.TestCase):
+    def test_series_report(self):
+        up = [[1, 1, 0, 0, 1, 1], [0, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1]]
+        report = series_report(up, ["a.com", "a.com", "b.com"], interval=60)
+        self.assertEqual(report['failures'], 1)
+        self.assertEqual(report['mtbf'], 900.0)
+        self.assertEqual(report['mttr'], 90.0)
+        self.assertEqual(report['host_mttr']['p50'], 90.0)
+        self.assertEqual(report['domains']['a.com']['availability'], 75.0)
+        self.assertEqual(report['domains']['b.com']['worst_host_availability'], 100.0)
+
+    def test_pooled_mttr(self):
+        # one 4-sample outage and four 1-sample outages: 8 down samples over 5 outages
+        up = [[0, 0, 0, 0, 1, 1, 1, 1, 1], [0, 1, 0, 1, 0, 1, 0, 1, 1]]
+        self.assertEqual(series_report(up, interval=10)['mttr'], 16.0)
+
+    def test_no_samples(self):
+        report = series_report(np.zeros((3, 0), dtype=bool), ["a.com"] * 3)
+        self.assertEqual((report['hosts'], report['failures']), (3, 0))
+        self.assertIsNone(report['availability'])
+        self.assertIsNone(report['mttr'])
+
+    def test_fleet_report_matches_store(self):
+        servers = [Webserver("10.0.0.1", 80, "online", 90, 10, "a.com"),
+                   Webserver("10.0.0.2", 80, "online", 50, 50, "a.com")]
+        store = FleetStore()
+        for server in servers:
+            store.add(server)
+        self.assertEqual(fleet_report(servers), fleet_report(store))
+        self.assertEqual(fleet_report(store)['availability'], 70.0)
+
+    def test_store_can_grow_after_fleet_columns(self):
+        store = FleetStore()
+        store.add(Server("10.0.0.1", 80, "online", 90, 10))
+        uptime, _, _ = fleet_columns(store)
+        store.add(Server("10.0.0.2", 80, "online", 50, 50))
+        self.assertEqual(uptime.tolist(), [90.0])
+        self.assertEqual(len(store), 2)
+
+class TestHealthChecker(unittest.IsolatedAsyncioTestCase):
+    banner = b''
+
+    async def asyncSetUp(self):
+        self.connections = []
+
+        async def handle(reader, writer):
+            self.connections.append(writer)
+            if self.banner:
+                writer.write(self.banner)
+            await reader.read()
+
+        self.listener = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = self.listener.sockets[0].getsockname()[1]
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            closed_port = sock.getsockname()[1]
+        self.up = Server('127.0.0.1', port, 'offline', 0, 0)
+        self.down = Server('127.0.0.1', closed_port, 'online', 0, 0)
+        self.fleet = ServerFleet([self.up, self.down])
+        self.checker = HealthChecker(self.fleet, interval=0.05, timeout=1, reuse_connections=True)
+
+    async def asyncTearDown(self):
+        self.checker.close()
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def test_status_and_uptime(self):
+        self.assertEqual(await self.checker.check_once(), 1)
+        self.assertEqual(self.fleet.online(), [self.up])
+        self.assertEqual(self.fleet.offline(), [self.down])
+        await asyncio.sleep(0.05)
+        await self.checker.check_once()
+        self.assertGreater(self.up.uptime, 0)
+        self.assertGreater(self.down.downtime, 0)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.checker.hosts[1].failures, 2)
+        self.assertGreater(self.checker.delay(self.checker.hosts[1]), self.checker.interval * 1.5)
+
+    async def test_closed_connection_is_rechecked(self):
+        await self.checker.check_once()
+        self.connections[0].close()
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.checker.check_once(), 1)
+        self.assertEqual(len(self.connections), 2)
+
+    async def test_run_until_stopped(self):
+        task = asyncio.ensure_future(self.checker.run())
+        await asyncio.sleep(0.3)
+        self.checker.stop()
+        await task
+        self.assertEqual(self.up.status, 'online')
+        self.assertGreater(self.checker.checks, 4)
+
+    async def test_reconnects_after_keepalive(self):
+        self.checker.keepalive = 0.05
+        await self.checker.check_once()
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.checker.check_once(), 1)
+        self.assertEqual(len(self.connections), 2)
+
+    async def test_closes_after_each_probe_by_default(self):
+        checker = HealthChecker([self.up], interval=0.05, timeout=1)
+        await checker.check_once()
+        await checker.check_once()
+        self.assertEqual(len(self.connections), 2)
+        self.assertIsNone(checker.hosts[0].writer)
+
+    async def test_pool_is_capped(self):
+        other = Server('127.0.0.1', self.up.port, 'offline', 0, 0)
+        checker = HealthChecker([self.up, other], interval=0.05, timeout=1, reuse_connections=True,
+                                max_connections=1)
+        self.assertEqual(await checker.check_once(), 2)
+        self.assertEqual(sum(state.writer is not None for state in checker.hosts), 1)
+        checker.close()
+
+class TestHealthCheckerWithBanner(TestHealthChecker):
+    # A peer that greets first (SSH, SMTP): its close must still be noticed.
+    banner = b'SSH-2.0-OpenSSH_9.6\r\n'
+
+    async def test_closed_connection_is_rechecked(self):
+        await self.checker.check_once()
+        self.connections[0].close()
+        self.listener.close()
+        await self.listener.wait_closed()
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.checker.check_once(), 0)
+        self.assertEqual(self.fleet.online(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import functools
+
+from EnvironmentConfigVersionControl import EnvironmentManager, default_validator
+
+# asyncio front end for the version-controlled EnvironmentManager.
+#
+# In-memory state is only touched on the event loop thread: writers snapshot it there and
+# hand the snapshot to an executor for the file and git work, and imports parse the file in
+# the executor before applying it on the loop. Reads stay plain synchronous lookups, so a
+# slow commit never holds up a config read.
+
+
+class AsyncEnvironmentManager:
+    def __init__(self, env_mgr: EnvironmentManager = None, repo_path: str = None,
+                 max_pending_writes: int = 100, writers: int = 4, executor=None):
+        self.env_mgr = env_mgr if env_mgr is not None else EnvironmentManager(repo_path=repo_path)
+        self.max_pending_writes = max_pending_writes
+        self.writers = writers
+        self._executor = executor
+        self._queue = None
+        self._writer_tasks = []
+        self._vcs_lock = None
+        # Per-file write locks and the sequence number of each file's newest written
+        # snapshot: with several writers, two saves of one environment could otherwise
+        # overlap and the older snapshot land last.
+        self._file_locks = {}
+        self._written = {}
+        self._sequence = 0
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending_writes)
+        self._vcs_lock = asyncio.Lock()
+        self._writer_tasks = [asyncio.create_task(self._writer()) for _ in range(self.writers)]
+
+    async def close(self):
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for task in self._writer_tasks:
+            task.cancel()
+        await asyncio.gather(*self._writer_tasks, return_exceptions=True)
+        self._queue = None
+        self._writer_tasks = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _writer(self):
+        while True:
+            file_path, sequence, configurations, done = await self._queue.get()
+            try:
+                lock = self._file_locks.setdefault(file_path, asyncio.Lock())
+                async with lock:
+                    # A newer snapshot of this file is already on disk
+                    if self._written.get(file_path, -1) < sequence:
+                        await self._run(self.env_mgr.write_json, file_path, configurations)
+                        self._written[file_path] = sequence
+                # The caller may have stopped waiting (cancelled its future)
+                if not done.done():
+                    done.set_result(file_path)
+            except Exception as error:
+                if not done.done():
+                    done.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+    # Reads: synchronous and lock-free, they never wait on file or VCS work.
+
+    def list_environments(self):
+        return self.env_mgr.list_environments()
+
+    def get_configuration(self, env_name: str, config_name: str) -> dict:
+        return self.env_mgr.environments[env_name].configurations[config_name].get_config_value()
+
+    # Writes.
+
+    async def save_environment(self, env_name: str):
+        # Queues the environment's file write; waits for a free slot when max_pending_writes
+        # writes are already queued, and returns once the file is on disk.
+        await self.start()
+        done = asyncio.get_running_loop().create_future()
+        snapshot = self.env_mgr.snapshot_environment(env_name)
+        self._sequence += 1
+        await self._queue.put((self.env_mgr.environment_file(env_name), self._sequence, snapshot, done))
+        return await done
+
+    async def export_configurations(self, file_path: str):
+        await self._run(self.env_mgr.write_json, file_path, self.env_mgr.snapshot())
+        print(f"Configurations exported to {file_path}")
+
+    async def import_configurations(self, file_path: str, chunk_size: int = 100):
+        data = await self._run(self.env_mgr.read_json, file_path)
+        # All of it is validated before the first chunk lands, so a bad entry in a later
+        # chunk can't leave the earlier ones applied.
+        await self._run(default_validator.validate_bulk, data)
+        items = list(data.items())
+        for start in range(0, len(items), chunk_size):
+            self.env_mgr.apply_configurations(dict(items[start:start + chunk_size]), validate=False)
+            # Let other tasks (reads included) run between chunks of a large import.
+            await asyncio.sleep(0)
+        print(f"Configurations imported from {file_path}")
+
+    async def git_commit(self, message: str):
+        await self.start()
+        async with self._vcs_lock:
+            await self._queue.join()
+            changed, removed = self.env_mgr.take_changes()
+            try:
+                await self._run(self.env_mgr.commit_snapshot, changed, message, removed)
+            except Exception:
+                self.env_mgr.restore_changes(changed, removed)
+                raise
+
+    async def git_push(self, remote_name: str = 'origin', branch: str = 'main'):
+        await self.start()
+        async with self._vcs_lock:
+            await self._run(self.env_mgr.git_push, remote_name, branch)
+
+    async def git_pull(self, remote_name: str = 'origin', branch: str = 'main'):
+        await self.start()
+        async with self._vcs_lock:
+            await self._run(self.env_mgr.git_pull, remote_name, branch)
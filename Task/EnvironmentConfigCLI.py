@@ -1,5 +1,6 @@
 import argparse
 import json
+import os
 from datetime import datetime
 from typing import Dict, List
 
@@ -35,23 +36,26 @@ class Environment:
     def add_configuration(self, config_name: str, content: dict):
         if config_name in self.configurations:
             print(f"Configuration {config_name} already exists. Use update_configuration to update it.")
-        else:
-            self.configurations[config_name] = content
-            print(f"Configuration {config_name} added.")
+            return False
+        self.configurations[config_name] = content
+        print(f"Configuration {config_name} added.")
+        return True
 
     def update_configuration(self, config_name: str, content: dict):
         if config_name in self.configurations:
             self.configurations[config_name] = content
             print(f"Configuration {config_name} updated.")
-        else:
-            print(f"Configuration {config_name} does not exist. Use add_configuration to add it.")
+            return True
+        print(f"Configuration {config_name} does not exist. Use add_configuration to add it.")
+        return False
 
     def delete_configuration(self, config_name: str):
         if config_name in self.configurations:
             del self.configurations[config_name]
             print(f"Configuration {config_name} deleted.")
-        else:
-            print(f"Configuration {config_name} does not exist.")
+            return True
+        print(f"Configuration {config_name} does not exist.")
+        return False
 
 class EnvironmentManager:
     def __init__(self):
@@ -60,16 +64,18 @@ class EnvironmentManager:
     def add_environment(self, env_name: str):
         if env_name in self.environments:
             print(f"Environment {env_name} already exists.")
-        else:
-            self.environments[env_name] = Environment(env_name)
-            print(f"Environment {env_name} added.")
+            return False
+        self.environments[env_name] = Environment(env_name)
+        print(f"Environment {env_name} added.")
+        return True
 
     def remove_environment(self, env_name: str):
         if env_name in self.environments:
             del self.environments[env_name]
             print(f"Environment {env_name} removed.")
-        else:
-            print(f"Environment {env_name} does not exist.")
+            return True
+        print(f"Environment {env_name} does not exist.")
+        return False
 
     def list_environments(self):
         return list(self.environments.keys())
@@ -104,10 +110,113 @@ class EnvironmentManager:
                 differences[key] = {"env1": config1.get(key), "env2": config2.get(key)}
         return differences
 
-def main():
-    env_mgr = EnvironmentManager()
+# Append-only log backing the CLI: every successful change is one JSON line, so a single
+# add_config is one small append. The log is replayed lazily on first use of env_mgr.
+class EnvironmentStore:
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._env_mgr = None
+        # End of the last complete record when replay found a torn tail, else None
+        self._torn_at = None
+
+    @property
+    def env_mgr(self) -> EnvironmentManager:
+        if self._env_mgr is None:
+            self._env_mgr = EnvironmentManager()
+            self._replay()
+        return self._env_mgr
+
+    def _replay(self):
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A torn last line from an interrupted write. It is left on disk until the
+                    # next append cuts it off, so read-only commands never modify the store.
+                    self._torn_at = offset
+                    print(f"Store {self.file_path}: ignored an incomplete last record.")
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Store {self.file_path}: skipped an unreadable record.")
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: dict):
+        environments = self._env_mgr.environments
+        op = record['op']
+        if op == 'add_env':
+            environments.setdefault(record['env'], Environment(record['env']))
+        elif op == 'remove_env':
+            environments.pop(record['env'], None)
+        elif op in ('add_config', 'update_config', 'delete_config'):
+            env = environments.get(record['env'])
+            if env is None:
+                print(f"Store {self.file_path}: skipped a record for missing environment {record['env']}.")
+            elif op == 'delete_config':
+                env.configurations.pop(record['config'], None)
+            else:
+                env.configurations[record['config']] = record['value']
+
+    def _append(self, record: dict):
+        if self._torn_at is not None:
+            # Start the new record on a line of its own instead of after the torn bytes
+            with open(self.file_path, 'rb+') as f:
+                f.truncate(self._torn_at)
+            self._torn_at = None
+        with open(self.file_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def _get_environment(self, env_name: str):
+        env = self.env_mgr.environments.get(env_name)
+        if env is None:
+            print(f"Environment {env_name} does not exist.")
+        return env
 
+    def add_environment(self, env_name: str):
+        if self.env_mgr.add_environment(env_name):
+            self._append({'op': 'add_env', 'env': env_name})
+
+    def remove_environment(self, env_name: str):
+        if self.env_mgr.remove_environment(env_name):
+            self._append({'op': 'remove_env', 'env': env_name})
+
+    def add_configuration(self, env_name: str, config_name: str, content: dict):
+        env = self._get_environment(env_name)
+        if env is not None and env.add_configuration(config_name, content):
+            self._append({'op': 'add_config', 'env': env_name, 'config': config_name, 'value': content})
+
+    def update_configuration(self, env_name: str, config_name: str, content: dict):
+        env = self._get_environment(env_name)
+        if env is not None and env.update_configuration(config_name, content):
+            self._append({'op': 'update_config', 'env': env_name, 'config': config_name, 'value': content})
+
+    def delete_configuration(self, env_name: str, config_name: str):
+        env = self._get_environment(env_name)
+        if env is not None and env.delete_configuration(config_name):
+            self._append({'op': 'delete_config', 'env': env_name, 'config': config_name})
+
+    def compact(self):
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for env_name, env in self.env_mgr.environments.items():
+                f.write(json.dumps({'op': 'add_env', 'env': env_name}) + '\n')
+                for config_name, content in env.configurations.items():
+                    record = {'op': 'add_config', 'env': env_name, 'config': config_name, 'value': content}
+                    f.write(json.dumps(record) + '\n')
+        os.replace(tmp_path, self.file_path)
+        self._torn_at = None
+        print(f"Store {self.file_path} compacted.")
+
+def main():
     parser = argparse.ArgumentParser(description="Environment Manager CLI")
+    parser.add_argument('--store', type=str, default=os.environ.get('ENV_CONFIG_STORE', 'environments.log'),
+                        help='Path of the append-only store holding the environments')
     subparsers = parser.add_subparsers(dest='command')
 
     # Add environment command
@@ -144,25 +253,31 @@ def main():
     compare_configs_parser.add_argument('env2_name', type=str, help='The name of the second environment')
     compare_configs_parser.add_argument('config_name', type=str, help='The name of the configuration to compare')
 
+    # Compact store command
+    subparsers.add_parser('compact', help='Rewrite the store with one record per live entry')
+
     args = parser.parse_args()
+    store = EnvironmentStore(args.store)
 
     if args.command == 'add_env':
-        env_mgr.add_environment(args.env_name)
+        store.add_environment(args.env_name)
     elif args.command == 'remove_env':
-        env_mgr.remove_environment(args.env_name)
+        store.remove_environment(args.env_name)
     elif args.command == 'list_envs':
-        environments = env_mgr.list_environments()
+        environments = store.env_mgr.list_environments()
         print("Environments:", environments)
     elif args.command == 'add_config':
         config_value = json.loads(args.config_value)
-        env_mgr.environments[args.env_name].add_configuration(args.config_name, config_value)
+        store.add_configuration(args.env_name, args.config_name, config_value)
     elif args.command == 'update_config':
         config_value = json.loads(args.config_value)
-        env_mgr.environments[args.env_name].update_configuration(args.config_name, config_value)
+        store.update_configuration(args.env_name, args.config_name, config_value)
     elif args.command == 'delete_config':
-        env_mgr.environments[args.env_name].delete_configuration(args.config_name)
+        store.delete_configuration(args.env_name, args.config_name)
+    elif args.command == 'compact':
+        store.compact()
     elif args.command == 'compare_configs':
-        comparison = env_mgr.compare_configurations(args.env1_name, args.env2_name, args.config_name)
+        comparison = store.env_mgr.compare_configurations(args.env1_name, args.env2_name, args.config_name)
         print("Comparison:", comparison)
     else:
         parser.print_help()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+from EnvironmentConfigConcurrent import ConcurrentEnvironmentManager
+
+# Stress test and read-scaling benchmark for ConcurrentEnvironmentManager.
+#
+#   python EnvironmentConfigConcurrencyBenchmark.py --envs 200 --reads 200000
+#
+# The stress phase races writer threads on the same names and checks that every
+# add-if-absent wins exactly once. The read phase measures lock-free lookups with 1..N
+# threads while a writer keeps publishing updates. On a GIL build of CPython the threads
+# share one core, so scaling only shows up on a free-threaded (3.13t+) interpreter.
+
+
+def stress(env_mgr: ConcurrentEnvironmentManager, threads: int, names: int) -> int:
+    wins = [0] * threads
+    barrier = threading.Barrier(threads)
+
+    def writer(index: int):
+        barrier.wait()
+        for i in range(names):
+            env = env_mgr.get_or_add_environment(f"stress-{i % 16}")
+            if env.add_configuration_if_absent(f"config-{i}", {'writer': index, 'value': i}):
+                wins[index] += 1
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stored = sum(len(env_mgr.environments[f"stress-{i}"].configurations) for i in range(min(16, names)))
+    if sum(wins) != names or stored != names:
+        raise AssertionError(f"Lost or duplicated writes: {sum(wins)} wins, {stored} stored, {names} expected")
+    return sum(wins)
+
+
+def read_throughput(env_mgr: ConcurrentEnvironmentManager, env_names: list, threads: int, reads: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+    stop_writer = threading.Event()
+
+    def reader():
+        get = env_mgr.get_configuration
+        count = len(env_names)
+        barrier.wait()
+        for i in range(reads):
+            if get(env_names[i % count], 'database') is None:
+                raise AssertionError("Read saw a missing configuration")
+
+    def writer():
+        port = 0
+        while not stop_writer.is_set():
+            port += 1
+            env = env_mgr.environments[env_names[port % len(env_names)]]
+            env.update_configuration('database', {'url': 'db.internal', 'port': port}, verbose=False)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    background = threading.Thread(target=writer)
+    for worker in workers:
+        worker.start()
+    background.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    stop_writer.set()
+    background.join()
+    return threads * reads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ConcurrentEnvironmentManager benchmark")
+    parser.add_argument('--envs', type=int, default=200, help='Number of environments to read from')
+    parser.add_argument('--reads', type=int, default=200000, help='Reads per thread')
+    parser.add_argument('--max-threads', type=int, default=os.cpu_count() or 1, help='Largest reader thread count')
+    parser.add_argument('--stress-names', type=int, default=20000, help='Configurations raced in the stress phase')
+    args = parser.parse_args()
+
+    env_mgr = ConcurrentEnvironmentManager()
+    print(f"Stress: {stress(env_mgr, 8, args.stress_names)} add-if-absent wins, no lost or duplicated writes")
+
+    env_names = [f"env-{i}" for i in range(args.envs)]
+    for env_name in env_names:
+        env = env_mgr.get_or_add_environment(env_name)
+        env.add_configuration_if_absent('database', {'url': 'db.internal', 'port': 5432})
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+    print(f"{'threads':>8} {'reads/s':>14} {'scaling':>8}")
+    baseline = None
+    threads = 1
+    while threads <= args.max_threads:
+        rate = read_throughput(env_mgr, env_names, threads, args.reads)
+        baseline = baseline or rate
+        print(f"{threads:>8} {rate:>14,.0f} {rate / baseline:>7.2f}x")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+
+from EnvironmentConfigImp2 import Environment, EnvironmentManager
+from EnvironmentConfigIntern import intern_config
+
+# Thread-safe variants of Environment/EnvironmentManager.
+#
+# Writers never mutate a dict that a reader might be looking at: they take a lock, copy the
+# dict, change the copy and publish it with a single attribute assignment. Readers just read
+# self.environments / env.configurations and index into whatever snapshot they got, so the
+# read path takes no locks. Each environment has its own lock, so writes to different
+# environments never wait on each other.
+
+
+class ConcurrentEnvironment(Environment):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+
+    def add_configuration_if_absent(self, config_name: str, content: dict) -> bool:
+        with self._lock:
+            if config_name in self.configurations:
+                return False
+            configurations = dict(self.configurations)
+            configurations[config_name] = intern_config(content)
+            self.configurations = configurations
+            return True
+
+    def add_configuration(self, config_name: str, content: dict, verbose: bool = True):
+        if not self.add_configuration_if_absent(config_name, content):
+            print(f"Configuration {config_name} already exists. Use update_configuration to update it.")
+        elif verbose:
+            print(f"Configuration {config_name} added.")
+
+    def update_configuration(self, config_name: str, content: dict, verbose: bool = True):
+        with self._lock:
+            exists = config_name in self.configurations
+            if exists:
+                configurations = dict(self.configurations)
+                configurations[config_name] = intern_config(content)
+                self.configurations = configurations
+        if not exists:
+            print(f"Configuration {config_name} does not exist. Use add_configuration to add it.")
+        elif verbose:
+            print(f"Configuration {config_name} updated.")
+
+    def delete_configuration(self, config_name: str):
+        with self._lock:
+            exists = config_name in self.configurations
+            if exists:
+                configurations = dict(self.configurations)
+                del configurations[config_name]
+                self.configurations = configurations
+        if exists:
+            print(f"Configuration {config_name} deleted.")
+        else:
+            print(f"Configuration {config_name} does not exist.")
+
+
+class ConcurrentEnvironmentManager(EnvironmentManager):
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def get_or_add_environment(self, env_name: str) -> ConcurrentEnvironment:
+        env = self.environments.get(env_name)
+        if env is not None:
+            return env
+        with self._lock:
+            env = self.environments.get(env_name)
+            if env is None:
+                env = ConcurrentEnvironment(env_name)
+                environments = dict(self.environments)
+                environments[env_name] = env
+                self.environments = environments
+            return env
+
+    def add_environment(self, env_name: str, verbose: bool = True):
+        with self._lock:
+            exists = env_name in self.environments
+            if not exists:
+                environments = dict(self.environments)
+                environments[env_name] = ConcurrentEnvironment(env_name)
+                self.environments = environments
+        if exists:
+            print(f"Environment {env_name} already exists.")
+        elif verbose:
+            print(f"Environment {env_name} added.")
+
+    def remove_environment(self, env_name: str):
+        with self._lock:
+            exists = env_name in self.environments
+            if exists:
+                environments = dict(self.environments)
+                del environments[env_name]
+                self.environments = environments
+        if exists:
+            print(f"Environment {env_name} removed.")
+        else:
+            print(f"Environment {env_name} does not exist.")
+
+    def get_configuration(self, env_name: str, config_name: str, default=None):
+        # Lock-free read against the current snapshots.
+        env = self.environments.get(env_name)
+        if env is None:
+            return default
+        return env.configurations.get(config_name, default)
@@ -0,0 +1,172 @@
+import hashlib
+
+from EnvironmentConfigIntern import FrozenConfig, FrozenList, digest_dict, digest_list, digest_scalar
+
+# Placeholder for a key or configuration an environment does not have.
+MISSING = object()
+MISSING_DIGEST = hashlib.blake2b(b'm', digest_size=16).digest()
+
+
+class StructuralHasher:
+    # Content hash of nested dict/list/scalar values, using the same scheme as the interning
+    # layer so interned nodes are compared by their stored digest. Other digests are memoised
+    # by object identity, so a subtree shared between environments is hashed once per audit.
+    def __init__(self):
+        self._memo = {}
+
+    def __call__(self, value) -> bytes:
+        if value is MISSING:
+            return MISSING_DIGEST
+        if isinstance(value, (FrozenConfig, FrozenList)):
+            return value.digest
+        cached = self._memo.get(id(value))
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        try:
+            if isinstance(value, dict):
+                result = digest_dict((key, self(child)) for key, child in value.items())
+            elif isinstance(value, list):
+                result = digest_list(self(child) for child in value)
+            else:
+                result = digest_scalar(value)
+        except TypeError:
+            # Not JSON (a set, a tuple key, ...): compared by type and repr instead
+            text = f"{type(value).__qualname__}:{value!r}".encode('utf-8')
+            result = hashlib.blake2b(b'o' + text, digest_size=16).digest()
+        # Keep a reference to the value so its id cannot be reused while the memo is alive.
+        self._memo[id(value)] = (value, result)
+        return result
+
+
+class DriftMatrix:
+    # One row per (config_name, path) that is not identical everywhere. Each row stores the
+    # distinct values seen there once, plus one variant index per environment (-1 = missing).
+    def __init__(self, environments: list):
+        self.environments = environments
+        self.rows = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add_row(self, config_name: str, path: tuple, variants: list, assignment: list):
+        present = [i for i, value in enumerate(variants) if value is not MISSING]
+        remap = {old: new for new, old in enumerate(present)}
+        self.rows.append({
+            "config_name": config_name,
+            "path": path,
+            "variants": [variants[i] for i in present],
+            "assignment": [remap.get(i, -1) for i in assignment]
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            "environments": self.environments,
+            "drift": [
+                {
+                    "config_name": row["config_name"],
+                    "path": ".".join(str(key) for key in row["path"]),
+                    "variants": row["variants"],
+                    "assignment": row["assignment"]
+                }
+                for row in self.rows
+            ]
+        }
+
+    def _value(self, row: dict, env_index: int):
+        variant = row["assignment"][env_index]
+        return None if variant < 0 else row["variants"][variant]
+
+    def differences(self, env1_name: str, env2_name: str, config_name: str = None) -> dict:
+        # Pairwise view in the same shape as EnvironmentManager._find_differences, keyed by
+        # "config_name.path" (or just the path when config_name is given).
+        first = self.environments.index(env1_name)
+        second = self.environments.index(env2_name)
+        differences = {}
+        for row in self.rows:
+            if config_name is not None and row["config_name"] != config_name:
+                continue
+            if row["assignment"][first] == row["assignment"][second]:
+                continue
+            path = row["path"] if config_name is not None else (row["config_name"],) + row["path"]
+            key = ".".join(str(part) for part in path)
+            differences[key] = {"env1": self._value(row, first), "env2": self._value(row, second)}
+        return differences
+
+    def drifted_from(self, baseline_env: str) -> dict:
+        baseline = self.environments.index(baseline_env)
+        drifted = {}
+        for row in self.rows:
+            path = ".".join(str(part) for part in (row["config_name"],) + row["path"])
+            for env_index, env_name in enumerate(self.environments):
+                if row["assignment"][env_index] != row["assignment"][baseline]:
+                    drifted.setdefault(env_name, []).append(path)
+        return drifted
+
+
+class DiffEngine:
+    # Compares any number of environments across every configuration in a single pass.
+    # Identical subtrees collapse to one variant by structural hash, so only the distinct
+    # values at a path are ever walked, however many environments share them.
+    def __init__(self):
+        self.hasher = StructuralHasher()
+
+    def _dedupe(self, values: list):
+        variants, assignment, index_of = [], [], {}
+        for value in values:
+            digest = self.hasher(value)
+            index = index_of.get(digest)
+            if index is None:
+                index = index_of[digest] = len(variants)
+                variants.append(value)
+            assignment.append(index)
+        return variants, assignment
+
+    def _walk(self, matrix: DriftMatrix, config_name: str, path: tuple, variants: list, assignment: list):
+        if len(variants) == 1:
+            return
+        # Recurse when every present variant is a dict: an environment missing the whole
+        # subtree is missing each key below it, so MISSING is only ever recorded at a leaf
+        # and a pair's differences don't depend on which other environments are compared.
+        present = [value for value in variants if value is not MISSING]
+        if present and all(isinstance(value, dict) for value in present):
+            keys = []
+            seen = set()
+            for value in present:
+                for key in value:
+                    if key not in seen:
+                        seen.add(key)
+                        keys.append(key)
+            for key in keys:
+                child_variants, child_of_variant = self._dedupe(
+                    [MISSING if value is MISSING else value.get(key, MISSING) for value in variants])
+                child_assignment = [child_of_variant[index] for index in assignment]
+                self._walk(matrix, config_name, path + (key,), child_variants, child_assignment)
+            return
+        matrix.add_row(config_name, path, variants, assignment)
+
+    def compare(self, environments: dict, env_names: list = None, config_names: list = None) -> DriftMatrix:
+        env_names = list(environments) if env_names is None else list(env_names)
+        for env_name in env_names:
+            if env_name not in environments:
+                raise ValueError(f"Environment {env_name} does not exist.")
+        envs = [environments[env_name] for env_name in env_names]
+
+        if config_names is None:
+            config_names = []
+            seen = set()
+            for env in envs:
+                for config_name in env.configurations:
+                    if config_name not in seen:
+                        seen.add(config_name)
+                        config_names.append(config_name)
+
+        matrix = DriftMatrix(env_names)
+        for config_name in config_names:
+            values = [env.configurations.get(config_name, MISSING) for env in envs]
+            variants, assignment = self._dedupe(values)
+            self._walk(matrix, config_name, (), variants, assignment)
+        return matrix
+
+
+def diff_environments(env_mgr, env_names: list = None, config_names: list = None) -> DriftMatrix:
+    return DiffEngine().compare(env_mgr.environments, env_names, config_names)
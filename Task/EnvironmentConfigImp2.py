@@ -1,6 +1,9 @@
+import hashlib
 import json
 from datetime import datetime
 
+from EnvironmentConfigIntern import intern_config
+
 class VersionedConfig:
     def __init__(self, content: dict, version: int):
         self.content = content
@@ -26,21 +29,25 @@ class Configuration:
         self.timestamp = datetime.now()
 
 class Environment:
+    # Configuration values are interned: identical values share one read-only node, and
+    # update_configuration swaps in a new node rather than mutating the shared one.
     def __init__(self, name: str):
         self.name = name
         self.configurations = {}
 
-    def add_configuration(self, config_name: str, content: dict):
+    def add_configuration(self, config_name: str, content: dict, verbose: bool = True):
         if config_name in self.configurations:
             print(f"Configuration {config_name} already exists. Use update_configuration to update it.")
         else:
-            self.configurations[config_name] = content
-            print(f"Configuration {config_name} added.")
+            self.configurations[config_name] = intern_config(content)
+            if verbose:
+                print(f"Configuration {config_name} added.")
 
-    def update_configuration(self, config_name: str, content: dict):
+    def update_configuration(self, config_name: str, content: dict, verbose: bool = True):
         if config_name in self.configurations:
-            self.configurations[config_name] = content
-            print(f"Configuration {config_name} updated.")
+            self.configurations[config_name] = intern_config(content)
+            if verbose:
+                print(f"Configuration {config_name} updated.")
         else:
             print(f"Configuration {config_name} does not exist. Use add_configuration to add it.")
 
@@ -55,12 +62,13 @@ class EnvironmentManager:
     def __init__(self):
         self.environments = {}
 
-    def add_environment(self, env_name: str):
+    def add_environment(self, env_name: str, verbose: bool = True):
         if env_name in self.environments:
             print(f"Environment {env_name} already exists.")
         else:
             self.environments[env_name] = Environment(env_name)
-            print(f"Environment {env_name} added.")
+            if verbose:
+                print(f"Environment {env_name} added.")
 
     def remove_environment(self, env_name: str):
         if env_name in self.environments:
@@ -96,12 +104,21 @@ class EnvironmentManager:
     @staticmethod
     def _find_differences(config1: dict, config2: dict) -> dict:
         differences = {}
+        if config1 is config2:
+            # Interned values: the same node means the same content.
+            return differences
         keys = set(config1.keys()).union(set(config2.keys()))
         for key in keys:
             if config1.get(key) != config2.get(key):
                 differences[key] = {"env1": config1.get(key), "env2": config2.get(key)}
         return differences
 
+    def compare_environments(self, env_names: list = None, config_names: list = None):
+        # Drift across any number of environments and every configuration in one pass,
+        # recursing into nested values; see EnvironmentConfigDiff.DriftMatrix.
+        from EnvironmentConfigDiff import diff_environments
+        return diff_environments(self, env_names, config_names)
+
     def export_configurations(self, file_path: str):
         data = {env_name: env.configurations for env_name, env in self.environments.items()}
         with open(file_path, 'w') as f:
@@ -118,19 +135,89 @@ class EnvironmentManager:
                     self.environments[env_name].add_configuration(config_name, config_value)
         print(f"Configurations imported from {file_path}")
 
-# Example usage:
-env_mgr = EnvironmentManager()
-env_mgr.add_environment('development')
-env_mgr.add_environment('production')
+    # Streaming NDJSON format: one {"environment", "hash", "configurations"} record per line,
+    # so neither side ever holds more than one environment's configurations in memory.
 
-env_mgr.environments['development'].add_configuration('database', {'url': 'localhost', 'port': 5432})
-env_mgr.environments['production'].add_configuration('database', {'url': 'prod.db.com', 'port': 5432})
-
-# Export configurations to a file
-env_mgr.export_configurations('configurations.json')
+    @staticmethod
+    def content_hash(configurations: dict) -> str:
+        encoded = json.dumps(configurations, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def iter_environment_records(self):
+        for env_name, env in self.environments.items():
+            yield {
+                "environment": env_name,
+                "hash": self.content_hash(env.configurations),
+                "configurations": env.configurations
+            }
 
-# Import configurations from a file
-env_mgr.import_configurations('configurations.json')
+    @staticmethod
+    def read_environment_records(file_path: str):
+        with open(file_path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
 
-# List environments to verify import
-print("Environments list:", env_mgr.list_environments())
+    def export_configurations_stream(self, file_path: str, verbose: bool = True) -> int:
+        count = 0
+        with open(file_path, 'w') as f:
+            for record in self.iter_environment_records():
+                f.write(json.dumps(record, separators=(',', ':')))
+                f.write('\n')
+                count += 1
+        if verbose:
+            print(f"{count} environments streamed to {file_path}")
+        return count
+
+    def import_configurations_stream(self, file_path: str, verbose: bool = False) -> dict:
+        # Re-running an interrupted import is cheap: environments whose content hash already
+        # matches the record are skipped without touching their configurations.
+        imported, skipped = 0, 0
+        for record in self.read_environment_records(file_path):
+            env_name = record["environment"]
+            configs = record["configurations"]
+            record_hash = record.get("hash") or self.content_hash(configs)
+            env = self.environments.get(env_name)
+            if env is not None and self.content_hash(env.configurations) == record_hash:
+                skipped += 1
+                continue
+            if env is None:
+                self.add_environment(env_name, verbose=verbose)
+                env = self.environments[env_name]
+            for config_name, config_value in configs.items():
+                if config_name in env.configurations:
+                    env.update_configuration(config_name, config_value, verbose=verbose)
+                else:
+                    env.add_configuration(config_name, config_value, verbose=verbose)
+            imported += 1
+        if verbose:
+            print(f"Configurations streamed from {file_path}: {imported} imported, {skipped} unchanged")
+        return {"imported": imported, "skipped": skipped}
+
+    def export_snapshot(self, file_path: str):
+        # Binary, mmap-able snapshot; open it with EnvironmentConfigSnapshot.SnapshotEnvironmentManager.
+        from EnvironmentConfigSnapshot import write_snapshot
+        count = write_snapshot(self, file_path)
+        print(f"Snapshot with {count} entries written to {file_path}")
+
+if __name__ == "__main__":
+    # Example usage:
+    env_mgr = EnvironmentManager()
+    env_mgr.add_environment('development')
+    env_mgr.add_environment('production')
+
+    env_mgr.environments['development'].add_configuration('database', {'url': 'localhost', 'port': 5432})
+    env_mgr.environments['production'].add_configuration('database', {'url': 'prod.db.com', 'port': 5432})
+
+    # Export configurations to a file
+    env_mgr.export_configurations('configurations.json')
+
+    # Import configurations from a file
+    env_mgr.import_configurations('configurations.json')
+
+    # Stream configurations through the NDJSON format
+    env_mgr.export_configurations_stream('configurations.ndjson')
+    env_mgr.import_configurations_stream('configurations.ndjson', verbose=True)
+
+    # List environments to verify import
+    print("Environments list:", env_mgr.list_environments())
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import weakref
+
+# Content addressing shared by the interning layer and EnvironmentConfigDiff: a container's
+# digest is built from its children's digests, so equal values always get equal digests.
+# Digests follow the JSON text, so 1, 1.0 and True get different ones although Python
+# compares them equal; == and hash() on frozen nodes follow Python, not the digest.
+# Values JSON can't encode (a set, a tuple key, ...) have no digest: digest_* raise
+# TypeError, and the interner stores such values as given, uninterned.
+
+
+def digest_scalar(value) -> bytes:
+    return hashlib.blake2b(b's' + json.dumps(value, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+
+
+def digest_dict(items) -> bytes:
+    # Sorted by the encoded key, so keys of different types (1 and '1') are never compared.
+    digest = hashlib.blake2b(b'd', digest_size=16)
+    for encoded_key, child_digest in sorted((json.dumps(key).encode('utf-8'), child_digest)
+                                            for key, child_digest in items):
+        digest.update(encoded_key)
+        digest.update(child_digest)
+    return digest.digest()
+
+
+def digest_list(child_digests) -> bytes:
+    digest = hashlib.blake2b(b'l', digest_size=16)
+    for child_digest in child_digests:
+        digest.update(child_digest)
+    return digest.digest()
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Interned configuration values are read-only. Use update_configuration to change them.")
+
+
+class FrozenConfig(dict):
+    # Immutable, shared dict node. Still a dict, so json.dump and == against plain dicts work.
+    __slots__ = ('digest', '_hash', '__weakref__')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __eq__(self, other):
+        # Equal digests mean equal content; different ones can still be equal ({'p': 1} vs
+        # {'p': 1.0}), so those fall back to comparing the items.
+        if isinstance(other, FrozenConfig) and self.digest == other.digest:
+            return True
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # Built from the items, not the digest, so values that compare equal hash equal.
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (intern_config, (thaw(self),))
+
+
+class FrozenList(list):
+    __slots__ = ('digest', '_hash', '__weakref__')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = reverse = sort = clear = _read_only
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenList) and self.digest == other.digest:
+            return True
+        return list.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(tuple(self))
+            return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (intern_config, (thaw(self),))
+
+
+class ConfigInterner:
+    # Stores each distinct dict/list value once, keyed by content digest. Nodes are held
+    # weakly, so a value disappears from the table once no environment references it.
+    def __init__(self):
+        self._nodes = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _shared(self, digest: bytes, build):
+        node = self._nodes.get(digest)
+        if node is None:
+            node = build()
+            node.digest = digest
+            self._nodes[digest] = node
+        return node
+
+    def intern(self, value):
+        if isinstance(value, (FrozenConfig, FrozenList)):
+            return value
+        try:
+            if isinstance(value, dict):
+                children = {key: self.intern(child) for key, child in value.items()}
+                digest = digest_dict((key, content_digest(child)) for key, child in children.items())
+                return self._shared(digest, lambda: FrozenConfig(children))
+            if isinstance(value, list):
+                children = [self.intern(child) for child in value]
+                digest = digest_list(content_digest(child) for child in children)
+                return self._shared(digest, lambda: FrozenList(children))
+        except TypeError:
+            # Something inside isn't JSON, so there is no digest to share it under
+            return value
+        return value
+
+
+def content_digest(value) -> bytes:
+    if isinstance(value, (FrozenConfig, FrozenList)):
+        return value.digest
+    if isinstance(value, dict):
+        return digest_dict((key, content_digest(child)) for key, child in value.items())
+    if isinstance(value, list):
+        return digest_list(content_digest(child) for child in value)
+    return digest_scalar(value)
+
+
+def thaw(value):
+    # Mutable deep copy of an interned value, for callers that want to edit and re-submit it.
+    if isinstance(value, dict):
+        return {key: thaw(child) for key, child in value.items()}
+    if isinstance(value, list):
+        return [thaw(child) for child in value]
+    return value
+
+
+default_interner = ConfigInterner()
+
+
+def intern_config(value):
+    return default_interner.intern(value)
@@ -0,0 +1,194 @@
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+
+from EnvironmentConfigImp2 import EnvironmentManager
+
+# Snapshot layout:
+#   header  - magic, number of index entries, offset of the index
+#   values  - JSON encoded configuration values, back to back
+#   keys    - "<env>\0<config_name>" keys, back to back
+#   index   - fixed width (key_offset, key_len, value_offset, value_len) entries sorted by key
+# An entry with an empty config_name marks an environment, so empty environments survive.
+# Lookups binary search the index straight out of the mmap; nothing is parsed up front.
+MAGIC = b'ENVSNAP1'
+HEADER = struct.Struct('<8sIQ')
+INDEX_ENTRY = struct.Struct('<QIQI')
+SEPARATOR = b'\0'
+
+
+def _key(env_name: str, config_name: str = '') -> bytes:
+    return env_name.encode('utf-8') + SEPARATOR + config_name.encode('utf-8')
+
+
+def write_snapshot(env_mgr: EnvironmentManager, file_path: str) -> int:
+    entries = []
+    for env_name, env in env_mgr.environments.items():
+        entries.append((_key(env_name), b''))
+        for config_name, content in env.configurations.items():
+            value = json.dumps(content, separators=(',', ':')).encode('utf-8')
+            entries.append((_key(env_name, config_name), value))
+    entries.sort(key=lambda entry: entry[0])
+
+    with open(file_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        value_offsets = []
+        for _, value in entries:
+            value_offsets.append(f.tell())
+            f.write(value)
+        key_offsets = []
+        for key, _ in entries:
+            key_offsets.append(f.tell())
+            f.write(key)
+        index_offset = f.tell()
+        for (key, value), key_offset, value_offset in zip(entries, key_offsets, value_offsets):
+            f.write(INDEX_ENTRY.pack(key_offset, len(key), value_offset, len(value)))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(entries), index_offset))
+    return len(entries)
+
+
+class _SnapshotFile:
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._index_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{file_path} is not an environment snapshot.")
+
+    def close(self):
+        self._mm.close()
+
+    def _entry(self, position: int):
+        return INDEX_ENTRY.unpack_from(self._mm, self._index_offset + position * INDEX_ENTRY.size)
+
+    def key_at(self, position: int) -> bytes:
+        key_offset, key_len, _, _ = self._entry(position)
+        return self._mm[key_offset:key_offset + key_len]
+
+    def value_at(self, position: int):
+        _, _, value_offset, value_len = self._entry(position)
+        return json.loads(self._mm[value_offset:value_offset + value_len])
+
+    def lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, key: bytes) -> int:
+        position = self.lower_bound(key)
+        if position < self.count and self.key_at(position) == key:
+            return position
+        return -1
+
+
+class SnapshotConfigurations(Mapping):
+    def __init__(self, snapshot: _SnapshotFile, env_name: str):
+        self._snapshot = snapshot
+        self._env_name = env_name
+        self._prefix = _key(env_name)
+
+    def _range(self):
+        # The environment marker sorts first; its configurations follow until the prefix changes.
+        start = self._snapshot.lower_bound(self._prefix) + 1
+        end = self._snapshot.lower_bound(self._prefix[:-1] + b'\x01')
+        return start, end
+
+    def __getitem__(self, config_name: str):
+        position = self._snapshot.find(_key(self._env_name, config_name))
+        if position < 0:
+            raise KeyError(config_name)
+        return self._snapshot.value_at(position)
+
+    def __contains__(self, config_name) -> bool:
+        return self._snapshot.find(_key(self._env_name, config_name)) >= 0
+
+    def __iter__(self):
+        start, end = self._range()
+        for position in range(start, end):
+            yield self._snapshot.key_at(position)[len(self._prefix):].decode('utf-8')
+
+    def __len__(self) -> int:
+        start, end = self._range()
+        return end - start
+
+
+class SnapshotEnvironment:
+    def __init__(self, snapshot: _SnapshotFile, name: str):
+        self.name = name
+        self.configurations = SnapshotConfigurations(snapshot, name)
+
+    def add_configuration(self, config_name: str, content: dict, verbose: bool = True):
+        raise TypeError("Snapshot environments are read-only.")
+
+    update_configuration = add_configuration
+
+    def delete_configuration(self, config_name: str):
+        raise TypeError("Snapshot environments are read-only.")
+
+
+class SnapshotEnvironments(Mapping):
+    def __init__(self, snapshot: _SnapshotFile):
+        self._snapshot = snapshot
+
+    def __getitem__(self, env_name: str) -> SnapshotEnvironment:
+        if self._snapshot.find(_key(env_name)) < 0:
+            raise KeyError(env_name)
+        return SnapshotEnvironment(self._snapshot, env_name)
+
+    def __contains__(self, env_name) -> bool:
+        return self._snapshot.find(_key(env_name)) >= 0
+
+    def __iter__(self):
+        for position in range(self._snapshot.count):
+            key = self._snapshot.key_at(position)
+            if key.endswith(SEPARATOR):
+                yield key[:-1].decode('utf-8')
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class SnapshotEnvironmentManager(EnvironmentManager):
+    # Read-only EnvironmentManager over a snapshot written by write_snapshot. Only the pages
+    # touched by a lookup are read, so serving one configuration does not load the rest.
+    def __init__(self, file_path: str):
+        self._snapshot = _SnapshotFile(file_path)
+        self.environments = SnapshotEnvironments(self._snapshot)
+
+    def add_environment(self, env_name: str, verbose: bool = True):
+        raise TypeError("Snapshot environments are read-only.")
+
+    def remove_environment(self, env_name: str):
+        raise TypeError("Snapshot environments are read-only.")
+
+    def close(self):
+        self._snapshot.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Example usage:
+    env_mgr = EnvironmentManager()
+    env_mgr.add_environment('development')
+    env_mgr.add_environment('production')
+    env_mgr.environments['development'].add_configuration('database', {'url': 'localhost', 'port': 5432})
+    env_mgr.environments['production'].add_configuration('database', {'url': 'prod.db.com', 'port': 5432})
+    env_mgr.export_snapshot('configurations.snap')
+
+    with SnapshotEnvironmentManager('configurations.snap') as snapshot_mgr:
+        print("Environments list:", snapshot_mgr.list_environments())
+        print("Production database:", snapshot_mgr.environments['production'].configurations['database'])
+        print("Comparison:", snapshot_mgr.compare_configurations('development', 'production', 'database'))
@@ -0,0 +1,505 @@
+import copy
+import json
+import os
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+
+# GitPython is only needed to commit snapshots; everything else works without it.
+try:
+    from git import Repo
+except ImportError:
+    Repo = None
+
+
+def _escape(key: str) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(part: str) -> str:
+    return part.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old, new, path: str = '') -> list:
+    # JSON-patch style delta turning old into new: add/remove/replace ops on JSON pointer paths.
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = []
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'remove', 'path': f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child_path = f"{path}/{_escape(key)}"
+            if key not in old:
+                patch.append({'op': 'add', 'path': child_path, 'value': copy.deepcopy(value)})
+            elif old[key] != value:
+                patch.extend(make_patch(old[key], value, child_path))
+        return patch
+    if old == new:
+        return []
+    return [{'op': 'replace', 'path': path, 'value': copy.deepcopy(new)}]
+
+
+def apply_patch(document, patch: list):
+    # Applies the patch in place where possible and returns the resulting document.
+    for operation in patch:
+        if operation['path'] == '':
+            document = copy.deepcopy(operation['value'])
+            continue
+        parts = [_unescape(part) for part in operation['path'].split('/')[1:]]
+        target = document
+        for part in parts[:-1]:
+            target = target[part]
+        if operation['op'] == 'remove':
+            del target[parts[-1]]
+        else:
+            target[parts[-1]] = copy.deepcopy(operation['value'])
+    return document
+
+
+class VersionedConfig:
+    # A history entry. Checkpoints carry the full content; every other version only carries
+    # the patch from the previous version and has content None.
+    def __init__(self, content: dict, version: int, patch: list = None):
+        self.content = content
+        self.version = version
+        self.patch = patch
+        self.timestamp = datetime.now()
+
+    @property
+    def is_checkpoint(self) -> bool:
+        return self.content is not None
+
+    def __repr__(self):
+        return f"Version {self.version} at {self.timestamp}"
+
+
+class Validator:
+    # Schemas map keys to a type, a tuple of types or a nested schema dict; keys ending in "?"
+    # are optional and keys not in the schema are allowed. Each schema is compiled once into
+    # a checker closure and cached per config_name; configurations without a schema pass.
+    DEFAULT_SCHEMAS = {
+        'database': {'url': str, 'port': int}
+    }
+
+    def __init__(self, schemas: dict = None):
+        self.schemas = dict(self.DEFAULT_SCHEMAS if schemas is None else schemas)
+        self._checkers = {}
+        self._fast_checkers = {}
+
+    def register(self, config_name: str, schema: dict):
+        self.schemas[config_name] = schema
+        self._checkers.pop(config_name, None)
+        self._fast_checkers.pop(config_name, None)
+
+    @staticmethod
+    def _field(key):
+        # (name, optional); only string keys can carry the "?" marker
+        if isinstance(key, str) and key.endswith('?'):
+            return key[:-1], True
+        return key, False
+
+    @classmethod
+    def compile_fast(cls, schema):
+        # Predicate accepting exactly-typed valid values with no message building. Anything
+        # it rejects (invalid, or merely a subclass) goes through the full checker, which
+        # also produces the error messages.
+        if isinstance(schema, dict):
+            fields = tuple(cls._field(key) + (cls.compile_fast(sub_schema),)
+                           for key, sub_schema in schema.items())
+
+            def fast_dict(value):
+                if type(value) is not dict:
+                    return False
+                for name, optional, fast in fields:
+                    if name in value:
+                        if not fast(value[name]):
+                            return False
+                    elif not optional:
+                        return False
+                return True
+            return fast_dict
+
+        expected = frozenset(schema if isinstance(schema, tuple) else (schema,))
+        return lambda value: type(value) in expected
+
+    @classmethod
+    def compile(cls, schema, path: str = ''):
+        if isinstance(schema, dict):
+            fields = []
+            for key, sub_schema in schema.items():
+                name, optional = cls._field(key)
+                fields.append((name, optional, cls.compile(sub_schema, f"{path}.{name}" if path else str(name))))
+            fields = tuple(fields)
+            where = path or '<root>'
+
+            def check_dict(value, errors):
+                if type(value) is not dict and not isinstance(value, dict):
+                    errors.append(f"{where} must be an object")
+                    return
+                for name, optional, check in fields:
+                    if name in value:
+                        check(value[name], errors)
+                    elif not optional:
+                        errors.append(f"{where} is missing '{name}'")
+            return check_dict
+
+        expected = schema if isinstance(schema, tuple) else (schema,)
+        # bool is an int subclass, but True is not a valid port.
+        reject_bool = bool not in expected and any(issubclass(bool, kind) for kind in expected)
+        type_names = " or ".join(kind.__name__ for kind in expected)
+        where = path or '<root>'
+
+        def check_type(value, errors):
+            if type(value) in expected:
+                return
+            if not isinstance(value, expected) or (reject_bool and type(value) is bool):
+                errors.append(f"{where} must be {type_names}, got {type(value).__name__} {value!r}")
+        return check_type
+
+    def checker(self, config_name: str):
+        check = self._checkers.get(config_name)
+        if check is None and config_name in self.schemas:
+            check = self._checkers[config_name] = self.compile(self.schemas[config_name])
+        return check
+
+    def errors(self, config_name: str, value) -> list:
+        check = self.checker(config_name)
+        errors = []
+        if check is not None:
+            check(value, errors)
+        return [f"{config_name}: {error}" for error in errors]
+
+    def validate(self, config_name: str, value):
+        errors = self.errors(config_name, value)
+        if errors:
+            raise ValueError("; ".join(errors))
+
+    def fast_checker(self, config_name: str):
+        check = self._fast_checkers.get(config_name)
+        if check is None:
+            if config_name in self.schemas:
+                check = self.compile_fast(self.schemas[config_name])
+            else:
+                check = bool
+            self._fast_checkers[config_name] = check
+        return check
+
+    def validate_bulk(self, data: dict):
+        # One pass over {env_name: {config_name: value}} through the compiled fast checkers;
+        # only rejected values are re-checked to collect messages, and every error is
+        # reported rather than stopping at the first.
+        fast_checkers = {}
+        errors = []
+        for env_name, configs in data.items():
+            for config_name, value in configs.items():
+                fast = fast_checkers.get(config_name)
+                if fast is None:
+                    fast = fast_checkers[config_name] = self.fast_checker(config_name)
+                if fast is bool or fast(value):
+                    continue
+                found = []
+                self.checker(config_name)(value, found)
+                for error in found:
+                    errors.append(f"{env_name}/{config_name}: {error}")
+        if errors:
+            raise ValueError(f"{len(errors)} invalid configurations: " + "; ".join(errors))
+
+
+default_validator = Validator()
+
+
+class Configuration:
+    # Full snapshot every CHECKPOINT_INTERVAL versions, so rebuilding any version replays
+    # fewer than CHECKPOINT_INTERVAL patches.
+    CHECKPOINT_INTERVAL = 16
+
+    def __init__(self, config_name: str, config_value: dict, validator: Validator = None):
+        self.config_name = config_name
+        self.validator = validator if validator is not None else default_validator
+        self.validator.validate(config_name, config_value)
+        self.config_value = copy.deepcopy(config_value)
+        self.version = 1
+        self.timestamp = datetime.now()
+        self.history = []
+        self._timestamps = []
+        self._record(VersionedConfig(copy.deepcopy(self.config_value), self.version))
+
+    def _record(self, entry: VersionedConfig):
+        self.history.append(entry)
+        self._timestamps.append(entry.timestamp)
+        self.timestamp = entry.timestamp
+
+    def get_config_value(self) -> dict:
+        return self.config_value
+
+    def set_config_value(self, new_value: dict):
+        self.validator.validate(self.config_name, new_value)
+        new_value = copy.deepcopy(new_value)
+        patch = make_patch(self.config_value, new_value)
+        self.config_value = new_value
+        self.version += 1
+        if (self.version - 1) % self.CHECKPOINT_INTERVAL == 0:
+            entry = VersionedConfig(copy.deepcopy(new_value), self.version, patch)
+        else:
+            entry = VersionedConfig(None, self.version, patch)
+        self._record(entry)
+
+    def get_version(self, version: int) -> dict:
+        if version < 1 or version > self.version:
+            raise ValueError(f"Version {version} does not exist for {self.config_name}.")
+        if version == self.version:
+            return copy.deepcopy(self.config_value)
+        checkpoint = version - (version - 1) % self.CHECKPOINT_INTERVAL
+        value = copy.deepcopy(self.history[checkpoint - 1].content)
+        for entry in self.history[checkpoint:version]:
+            value = apply_patch(value, entry.patch)
+        return value
+
+    def get_value_as_of(self, timestamp: datetime) -> dict:
+        position = bisect_right(self._timestamps, timestamp)
+        if position == 0:
+            raise ValueError(f"{self.config_name} did not exist at {timestamp}.")
+        return self.get_version(position)
+
+    def rollback(self, version: int):
+        # Rolling back records a new version with the old content, so history is never rewritten.
+        self.set_config_value(self.get_version(version))
+
+
+class Environment:
+    # on_change(env_name) is called after every successful change; the manager uses it to
+    # track which environment files need writing on the next commit.
+    def __init__(self, name: str, on_change=None):
+        self.name = name
+        self.configurations = {}
+        self.on_change = on_change
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self.name)
+
+    def add_configuration(self, config_name: str, content: dict):
+        if config_name in self.configurations:
+            print(f"Configuration {config_name} already exists. Use update_configuration to update it.")
+        else:
+            self.configurations[config_name] = Configuration(config_name, content)
+            self._changed()
+            print(f"Configuration {config_name} added.")
+
+    def update_configuration(self, config_name: str, content: dict):
+        if config_name in self.configurations:
+            self.configurations[config_name].set_config_value(content)
+            self._changed()
+            print(f"Configuration {config_name} updated.")
+        else:
+            print(f"Configuration {config_name} does not exist. Use add_configuration to add it.")
+
+    def rollback_configuration(self, config_name: str, version: int):
+        if config_name in self.configurations:
+            self.configurations[config_name].rollback(version)
+            self._changed()
+            print(f"Configuration {config_name} rolled back to version {version}.")
+        else:
+            print(f"Configuration {config_name} does not exist.")
+
+    def delete_configuration(self, config_name: str):
+        if config_name in self.configurations:
+            del self.configurations[config_name]
+            self._changed()
+            print(f"Configuration {config_name} deleted.")
+        else:
+            print(f"Configuration {config_name} does not exist.")
+
+
+class EnvironmentManager:
+    # With a repo_path, every environment is kept as <repo_path>/<env_name>.json and
+    # git_commit/git_push/git_pull version them. repo_path must already be a git checkout.
+    # Changed and removed environments are tracked, so a commit only rewrites their files.
+    def __init__(self, repo_path: str = None):
+        self.environments = {}
+        self.repo_path = repo_path
+        self._repo = None
+        self._changed_envs = set()
+        self._removed_envs = set()
+        self._batch_depth = 0
+        if repo_path is not None:
+            os.makedirs(repo_path, exist_ok=True)
+
+    def mark_changed(self, env_name: str):
+        self._changed_envs.add(env_name)
+        self._removed_envs.discard(env_name)
+
+    def add_environment(self, env_name: str):
+        if env_name in self.environments:
+            print(f"Environment {env_name} already exists.")
+        else:
+            self.environments[env_name] = Environment(env_name, on_change=self.mark_changed)
+            self.mark_changed(env_name)
+            print(f"Environment {env_name} added.")
+
+    def remove_environment(self, env_name: str):
+        if env_name in self.environments:
+            del self.environments[env_name]
+            self._changed_envs.discard(env_name)
+            self._removed_envs.add(env_name)
+            print(f"Environment {env_name} removed.")
+        else:
+            print(f"Environment {env_name} does not exist.")
+
+    def list_environments(self):
+        return list(self.environments.keys())
+
+    def compare_configurations(self, env1_name: str, env2_name: str, config_name: str) -> dict:
+        if env1_name not in self.environments or env2_name not in self.environments:
+            raise ValueError("One or both environments do not exist.")
+
+        env1 = self.environments[env1_name]
+        env2 = self.environments[env2_name]
+
+        if config_name not in env1.configurations or config_name not in env2.configurations:
+            raise ValueError("Configuration does not exist in one or both environments.")
+
+        config1 = env1.configurations[config_name].get_config_value()
+        config2 = env2.configurations[config_name].get_config_value()
+
+        return {
+            "env1_name": env1_name,
+            "env1_config": config1,
+            "env2_name": env2_name,
+            "env2_config": config2,
+            "differences": self._find_differences(config1, config2)
+        }
+
+    @staticmethod
+    def _find_differences(config1: dict, config2: dict) -> dict:
+        differences = {}
+        keys = set(config1.keys()).union(set(config2.keys()))
+        for key in keys:
+            if config1.get(key) != config2.get(key):
+                differences[key] = {"env1": config1.get(key), "env2": config2.get(key)}
+        return differences
+
+    def snapshot_environment(self, env_name: str) -> dict:
+        # Plain {config_name: value} view. set_config_value replaces values instead of
+        # mutating them, so the snapshot stays consistent after later updates.
+        env = self.environments[env_name]
+        return {config_name: config.get_config_value() for config_name, config in env.configurations.items()}
+
+    def snapshot(self) -> dict:
+        return {env_name: self.snapshot_environment(env_name) for env_name in self.environments}
+
+    @staticmethod
+    def write_json(file_path: str, data: dict):
+        with open(file_path, 'w') as f:
+            json.dump(data, f, indent=4)
+
+    @staticmethod
+    def read_json(file_path: str) -> dict:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    def export_configurations(self, file_path: str):
+        self.write_json(file_path, self.snapshot())
+        print(f"Configurations exported to {file_path}")
+
+    def apply_configurations(self, data: dict, validate: bool = True):
+        # Validate the whole import up front so a bad entry leaves nothing half applied.
+        # Callers applying in parts validate the whole first and pass validate=False.
+        if validate:
+            default_validator.validate_bulk(data)
+        for env_name, configs in data.items():
+            if env_name not in self.environments:
+                self.add_environment(env_name)
+            for config_name, config_value in configs.items():
+                self.environments[env_name].add_configuration(config_name, config_value)
+
+    def import_configurations(self, file_path: str):
+        self.apply_configurations(self.read_json(file_path))
+        print(f"Configurations imported from {file_path}")
+
+    def environment_file(self, env_name: str) -> str:
+        return os.path.join(self.repo_path, f"{env_name}.json")
+
+    def write_environment_files(self, changed: dict, removed=()) -> list:
+        paths = []
+        for env_name, configurations in changed.items():
+            self.write_json(self.environment_file(env_name), configurations)
+            paths.append(f"{env_name}.json")
+        for env_name in removed:
+            if os.path.exists(self.environment_file(env_name)):
+                os.remove(self.environment_file(env_name))
+                paths.append(f"{env_name}.json")
+        return paths
+
+    def take_changes(self):
+        # Snapshots the environments changed since the last commit and resets the tracking.
+        changed = {env_name: self.snapshot_environment(env_name) for env_name in sorted(self._changed_envs)}
+        removed = set(self._removed_envs)
+        self._changed_envs.clear()
+        self._removed_envs.clear()
+        return changed, removed
+
+    def restore_changes(self, changed: dict, removed):
+        # Puts back changes taken for a commit that failed, so the next commit retries them.
+        for env_name in changed:
+            if env_name in self.environments:
+                self._changed_envs.add(env_name)
+        self._removed_envs.update(env_name for env_name in removed if env_name not in self.environments)
+
+    def get_repo(self):
+        if self._repo is None:
+            if Repo is None:
+                raise RuntimeError("GitPython is required to commit snapshots: pip install GitPython")
+            self._repo = Repo(self.repo_path)
+        return self._repo
+
+    def commit_snapshot(self, changed: dict, message: str, removed=(), stage_all: bool = True):
+        # Only touches the files and the repository, never self.environments, so it can run
+        # off the thread that owns the manager (see EnvironmentConfigAsync). Without
+        # stage_all, only the written/removed files are staged, in one `git add` call.
+        paths = self.write_environment_files(changed, removed)
+        repo = self.get_repo()
+        if stage_all:
+            repo.git.add(A=True)
+        elif paths:
+            repo.git.add('-A', '--', *paths)
+        else:
+            print("Nothing to commit.")
+            return
+        repo.index.commit(message)
+        print(f"Committed: {message}")
+
+    def git_commit(self, message: str):
+        changed, removed = self.take_changes()
+        try:
+            self.commit_snapshot(changed, message, removed)
+        except Exception:
+            self.restore_changes(changed, removed)
+            raise
+
+    @contextmanager
+    def batch(self, message: str):
+        # Applies any number of add/update/delete calls and commits them once on exit:
+        #     with env_mgr.batch("Migrate ports"):
+        #         env_mgr.environments['production'].update_configuration(...)
+        # Nested batches fold into the outermost one. Nothing is committed if the block raises.
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+        if self._batch_depth == 0:
+            changed, removed = self.take_changes()
+            try:
+                self.commit_snapshot(changed, message, removed, stage_all=False)
+            except Exception:
+                self.restore_changes(changed, removed)
+                raise
+
+    def git_push(self, remote_name: str = 'origin', branch: str = 'main'):
+        self.get_repo().remote(remote_name).push(branch)
+        print(f"Pushed {branch} to {remote_name}")
+
+    def git_pull(self, remote_name: str = 'origin', branch: str = 'main'):
+        self.get_repo().remote(remote_name).pull(branch)
+        print(f"Pulled {branch} from {remote_name}")
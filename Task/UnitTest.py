@@ -1,10 +1,20 @@
 import unittest
+import asyncio
 import json
 import os
 import shutil
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
 from datetime import datetime
 from unittest.mock import patch, MagicMock
 from EnvironmentConfigVersionControl import Configuration, Environment, EnvironmentManager, Validator, VersionedConfig
+from EnvironmentConfigAsync import AsyncEnvironmentManager
+from EnvironmentConfigCLI import EnvironmentStore
+from EnvironmentConfigImp2 import EnvironmentManager as InternedEnvironmentManager
+from EnvironmentConfigIntern import ConfigInterner, FrozenConfig, thaw
+from EnvironmentConfigSnapshot import SnapshotEnvironmentManager
+from EnvironmentConfigConcurrent import ConcurrentEnvironmentManager
 
 class TestConfiguration(unittest.TestCase):
     def setUp(self):
@@ -24,10 +34,63 @@ class TestConfiguration(unittest.TestCase):
         self.assertEqual(self.configuration.get_config_value(), new_value)
         self.assertEqual(self.configuration.version, 2)
 
+    def test_version_history(self):
+        values = [self.config_value]
+        for port in range(5433, 5433 + 40):
+            new_value = {'url': 'localhost', 'port': port, 'replica': {'port': port + 1}}
+            self.configuration.set_config_value(new_value)
+            values.append(new_value)
+        for version, value in enumerate(values, start=1):
+            self.assertEqual(self.configuration.get_version(version), value)
+        self.assertIsNone(self.configuration.history[1].content)
+        self.assertEqual(self.configuration.history[2].patch,
+                         [{'op': 'replace', 'path': '/port', 'value': 5434},
+                          {'op': 'replace', 'path': '/replica/port', 'value': 5435}])
+
+    def test_value_as_of_and_rollback(self):
+        first_timestamp = self.configuration.timestamp
+        self.configuration.set_config_value({'url': 'prod.db.com', 'port': 5432})
+        self.assertEqual(self.configuration.get_value_as_of(first_timestamp), self.config_value)
+        self.configuration.rollback(1)
+        self.assertEqual(self.configuration.get_config_value(), self.config_value)
+        self.assertEqual(self.configuration.version, 3)
+
     def test_validate_config(self):
         with self.assertRaises(ValueError):
             self.configuration.set_config_value({'url': 'localhost', 'port': 'invalid'})
 
+class TestValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = Validator({'database': {'url': str, 'port': int, 'replica?': {'host': str}}})
+
+    def test_nested_and_optional_keys(self):
+        self.validator.validate('database', {'url': 'localhost', 'port': 5432})
+        self.validator.validate('database', {'url': 'localhost', 'port': 5432, 'replica': {'host': 'r1'}})
+        with self.assertRaises(ValueError):
+            self.validator.validate('database', {'url': 'localhost', 'port': 5432, 'replica': {}})
+        with self.assertRaises(ValueError):
+            self.validator.validate('database', {'url': 'localhost', 'port': True})
+
+    def test_validate_bulk_reports_every_error(self):
+        data = {f'env{i}': {'database': {'url': 'localhost', 'port': 5432 + i}} for i in range(1000)}
+        data['env3']['database'] = {'url': 'localhost', 'port': 'invalid'}
+        data['env7']['database'] = {'port': 5432}
+        with self.assertRaises(ValueError) as context:
+            self.validator.validate_bulk(data)
+        self.assertIn('env3/database', str(context.exception))
+        self.assertIn('env7/database', str(context.exception))
+        self.assertTrue(str(context.exception).startswith('2 invalid configurations'))
+
+    def test_scalar_and_non_string_key_schemas(self):
+        self.validator.register('replicas', list)
+        self.validator.register('shards', {0: str, 'count?': int})
+        with self.assertRaises(ValueError) as context:
+            self.validator.validate_bulk({'e': {'replicas': 'x', 'shards': {0: 'a'}}})
+        self.assertIn('e/replicas: <root> must be list', str(context.exception))
+        self.validator.validate_bulk({'e': {'replicas': [], 'shards': {0: 'a', 'count': 2}}})
+        with self.assertRaises(ValueError):
+            self.validator.validate('shards', {0: 1})
+
 class TestEnvironment(unittest.TestCase):
     def setUp(self):
         self.env_name = 'development'
@@ -81,7 +144,7 @@ class TestEnvironmentManager(unittest.TestCase):
         self.assertIn('differences', comparison)
         self.assertIn('url', comparison['differences'])
 
-    @patch('config_manager.Repo')
+    @patch('EnvironmentConfigVersionControl.Repo')
     def test_git_commit(self, mock_repo):
         mock_repo.return_value.git.add = MagicMock()
         mock_repo.return_value.index.commit = MagicMock()
@@ -89,19 +152,389 @@ class TestEnvironmentManager(unittest.TestCase):
         mock_repo.return_value.git.add.assert_called_once_with(A=True)
         mock_repo.return_value.index.commit.assert_called_once_with('Test commit')
 
-    @patch('config_manager.Repo')
+    @patch('EnvironmentConfigVersionControl.Repo')
     def test_git_push(self, mock_repo):
         mock_remote = MagicMock()
         mock_repo.return_value.remote.return_value = mock_remote
         self.env_mgr.git_push('origin', 'main')
         mock_remote.push.assert_called_once_with('main')
 
-    @patch('config_manager.Repo')
+    @patch('EnvironmentConfigVersionControl.Repo')
     def test_git_pull(self, mock_repo):
         mock_remote = MagicMock()
         mock_repo.return_value.remote.return_value = mock_remote
         self.env_mgr.git_pull('origin', 'main')
         mock_remote.pull.assert_called_once_with('main')
 
+    @patch('EnvironmentConfigVersionControl.Repo')
+    def test_batch_commit(self, mock_repo):
+        self.env_mgr.git_commit('Initial commit')
+        mock_repo.reset_mock()
+        with self.env_mgr.batch('Migrate ports'):
+            for port in range(5432, 5532):
+                self.env_mgr.environments['production'].add_configuration(f'database{port}', {'port': port})
+                self.env_mgr.environments['production'].update_configuration(f'database{port}', {'port': port + 1})
+        mock_repo.return_value.git.add.assert_called_once_with('-A', '--', 'production.json')
+        mock_repo.return_value.index.commit.assert_called_once_with('Migrate ports')
+        with open(os.path.join(self.repo_path, 'production.json')) as f:
+            self.assertEqual(len(json.load(f)), 100)
+
+    @patch('EnvironmentConfigVersionControl.Repo')
+    def test_batch_not_committed_on_error(self, mock_repo):
+        with self.assertRaises(RuntimeError):
+            with self.env_mgr.batch('Broken migration'):
+                self.env_mgr.remove_environment('development')
+                raise RuntimeError('migration failed')
+        mock_repo.return_value.index.commit.assert_not_called()
+
+class TestAsyncEnvironmentManager(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repo_path = 'test_async_repo'
+        self.async_mgr = AsyncEnvironmentManager(repo_path=self.repo_path, max_pending_writes=2)
+        self.async_mgr.env_mgr.add_environment('development')
+        self.async_mgr.env_mgr.environments['development'].add_configuration('database', {'url': 'localhost', 'port': 5432})
+
+    def tearDown(self):
+        if os.path.exists(self.repo_path):
+            shutil.rmtree(self.repo_path)
+
+    async def test_export_import(self):
+        file_path = os.path.join(self.repo_path, 'export.json')
+        await self.async_mgr.export_configurations(file_path)
+        imported = AsyncEnvironmentManager()
+        await imported.import_configurations(file_path)
+        self.assertEqual(imported.get_configuration('development', 'database'), {'url': 'localhost', 'port': 5432})
+
+    async def test_invalid_import_applies_nothing(self):
+        file_path = os.path.join(self.repo_path, 'import.json')
+        data = {f'env{i}': {'database': {'url': 'localhost', 'port': 5432 + i}} for i in range(10)}
+        data['env9']['database']['port'] = 'invalid'
+        os.makedirs(self.repo_path, exist_ok=True)
+        with open(file_path, 'w') as f:
+            json.dump(data, f)
+        imported = AsyncEnvironmentManager()
+        with self.assertRaises(ValueError):
+            await imported.import_configurations(file_path, chunk_size=2)
+        self.assertEqual(imported.list_environments(), [])
+
+    async def test_save_environment(self):
+        async with self.async_mgr:
+            file_path = await self.async_mgr.save_environment('development')
+        with open(file_path) as f:
+            self.assertEqual(json.load(f), {'database': {'url': 'localhost', 'port': 5432}})
+
+    async def test_latest_save_wins(self):
+        env = self.async_mgr.env_mgr.environments['development']
+        async with self.async_mgr:
+            saves = []
+            for port in range(5433, 5441):
+                env.update_configuration('database', {'url': 'localhost', 'port': port})
+                saves.append(asyncio.ensure_future(self.async_mgr.save_environment('development')))
+            file_path = (await asyncio.gather(*saves))[0]
+        with open(file_path) as f:
+            self.assertEqual(json.load(f), {'database': {'url': 'localhost', 'port': 5440}})
+
+    async def test_cancelled_save_keeps_writers_alive(self):
+        self.async_mgr.writers = 1
+        async with self.async_mgr:
+            save = asyncio.ensure_future(self.async_mgr.save_environment('development'))
+            await asyncio.sleep(0)
+            save.cancel()
+            file_path = await asyncio.wait_for(self.async_mgr.save_environment('development'), 5)
+        self.assertTrue(os.path.exists(file_path))
+
+    @patch('EnvironmentConfigVersionControl.Repo')
+    async def test_git_commit(self, mock_repo):
+        async with self.async_mgr:
+            await self.async_mgr.git_commit('Async commit')
+        mock_repo.return_value.git.add.assert_called_once_with(A=True)
+        mock_repo.return_value.index.commit.assert_called_once_with('Async commit')
+
+class TestEnvironmentStore(unittest.TestCase):
+    def setUp(self):
+        self.file_path = 'test_store.log'
+        store = EnvironmentStore(self.file_path)
+        store.add_environment('development')
+        store.add_configuration('development', 'database', {'url': 'localhost', 'port': 5432})
+        store.update_configuration('development', 'database', {'url': 'localhost', 'port': 5433})
+        store.add_environment('staging')
+        store.remove_environment('staging')
+
+    def tearDown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def read_lines(self):
+        with open(self.file_path) as f:
+            return f.readlines()
+
+    def test_replay(self):
+        store = EnvironmentStore(self.file_path)
+        self.assertEqual(store.env_mgr.list_environments(), ['development'])
+        self.assertEqual(store.env_mgr.environments['development'].configurations['database'],
+                         {'url': 'localhost', 'port': 5433})
+
+    def test_lazy_open(self):
+        store = EnvironmentStore(self.file_path)
+        self.assertIsNone(store._env_mgr)
+        store.env_mgr
+        self.assertIsNotNone(store._env_mgr)
+
+    def test_compaction(self):
+        store = EnvironmentStore(self.file_path)
+        store.compact()
+        self.assertEqual(len(self.read_lines()), 2)
+        self.assertEqual(EnvironmentStore(self.file_path).env_mgr.environments['development'].configurations,
+                         {'database': {'url': 'localhost', 'port': 5433}})
+
+    def test_torn_tail(self):
+        with open(self.file_path, 'a') as f:
+            f.write('{"op": "add_config", "env": "devel')
+        store = EnvironmentStore(self.file_path)
+        store.add_configuration('development', 'cache', {'ttl': 60})
+        self.assertEqual(len(self.read_lines()), 6)
+        replayed = EnvironmentStore(self.file_path).env_mgr.environments['development'].configurations
+        self.assertEqual(replayed['cache'], {'ttl': 60})
+
+    def test_reading_leaves_a_torn_tail_in_place(self):
+        with open(self.file_path, 'a') as f:
+            f.write('{"op": "add_config", "env": "devel')
+        with open(self.file_path) as f:
+            before = f.read()
+        EnvironmentStore(self.file_path).env_mgr.list_environments()
+        with open(self.file_path) as f:
+            self.assertEqual(f.read(), before)
+
+    def test_record_for_missing_environment_is_skipped(self):
+        with open(self.file_path, 'a') as f:
+            f.write(json.dumps({'op': 'add_config', 'env': 'staging', 'config': 'cache', 'value': {}}) + '\n')
+            f.write(json.dumps({'op': 'delete_config', 'env': 'staging', 'config': 'cache'}) + '\n')
+            f.write(json.dumps({'op': 'add_config', 'env': 'development', 'config': 'cache', 'value': {}}) + '\n')
+        environments = EnvironmentStore(self.file_path).env_mgr.environments
+        self.assertEqual(set(environments), {'development'})
+        self.assertEqual(set(environments['development'].configurations), {'database', 'cache'})
+
+    def test_unreadable_record_is_skipped(self):
+        with open(self.file_path, 'a') as f:
+            f.write('{"op": "add_c\n')
+        store = EnvironmentStore(self.file_path)
+        store.add_configuration('development', 'cache', {'ttl': 60})
+        replayed = EnvironmentStore(self.file_path).env_mgr.environments['development'].configurations
+        self.assertEqual(set(replayed), {'database', 'cache'})
+
+class TestEnvironmentStreaming(unittest.TestCase):
+    def setUp(self):
+        self.file_path = 'test_environments.ndjson'
+        self.env_mgr = InternedEnvironmentManager()
+        for env_name, port in (('development', 5432), ('production', 5433)):
+            self.env_mgr.add_environment(env_name, verbose=False)
+            self.env_mgr.environments[env_name].add_configuration('database', {'url': 'localhost', 'port': port}, verbose=False)
+        self.env_mgr.add_environment('empty', verbose=False)
+
+    def tearDown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def test_round_trip(self):
+        self.assertEqual(self.env_mgr.export_configurations_stream(self.file_path, verbose=False), 3)
+        with open(self.file_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['environment'] for record in records], ['development', 'production', 'empty'])
+        imported = InternedEnvironmentManager()
+        self.assertEqual(imported.import_configurations_stream(self.file_path), {'imported': 3, 'skipped': 0})
+        self.assertEqual(imported.list_environments(), ['development', 'production', 'empty'])
+        self.assertEqual(imported.environments['production'].configurations['database'], {'url': 'localhost', 'port': 5433})
+
+    def test_unchanged_environments_are_skipped(self):
+        self.env_mgr.export_configurations_stream(self.file_path, verbose=False)
+        self.assertEqual(self.env_mgr.import_configurations_stream(self.file_path), {'imported': 0, 'skipped': 3})
+        self.env_mgr.environments['production'].update_configuration('database', {'url': 'prod.db.com'}, verbose=False)
+        self.assertEqual(self.env_mgr.import_configurations_stream(self.file_path), {'imported': 1, 'skipped': 2})
+        self.assertEqual(self.env_mgr.environments['production'].configurations['database']['port'], 5433)
+
+    def test_record_without_hash(self):
+        with open(self.file_path, 'w') as f:
+            f.write(json.dumps({'environment': 'staging', 'configurations': {'cache': {'ttl': 60}}}) + '\n\n')
+        self.assertEqual(self.env_mgr.import_configurations_stream(self.file_path), {'imported': 1, 'skipped': 0})
+        self.assertEqual(self.env_mgr.environments['staging'].configurations['cache'], {'ttl': 60})
+
+class TestEnvironmentSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.file_path = 'test_environments.snap'
+        env_mgr = InternedEnvironmentManager()
+        for env_name in ('dev2', 'dev', 'production', 'empty'):
+            env_mgr.add_environment(env_name, verbose=False)
+        environments = env_mgr.environments
+        environments['dev'].add_configuration('database', {'url': 'localhost', 'port': 5432}, verbose=False)
+        environments['dev'].add_configuration('cache', {'ttl': 60}, verbose=False)
+        environments['dev2'].add_configuration('database', {'url': 'dev2.db.com', 'port': 5432}, verbose=False)
+        environments['production'].add_configuration('database', {'url': 'prod.db.com', 'port': 5432}, verbose=False)
+        with redirect_stdout(StringIO()):
+            env_mgr.export_snapshot(self.file_path)
+        self.snapshot_mgr = SnapshotEnvironmentManager(self.file_path)
+
+    def tearDown(self):
+        self.snapshot_mgr.close()
+        os.remove(self.file_path)
+
+    def test_lookup(self):
+        environments = self.snapshot_mgr.environments
+        self.assertEqual(environments['dev'].configurations['database'], {'url': 'localhost', 'port': 5432})
+        self.assertEqual(environments['dev2'].configurations['database']['url'], 'dev2.db.com')
+        self.assertIn('empty', environments)
+        self.assertNotIn('de', environments)
+        self.assertNotIn('cache', environments['dev2'].configurations)
+        with self.assertRaises(KeyError):
+            environments['dev2'].configurations['cache']
+        with self.assertRaises(KeyError):
+            environments['staging']
+        comparison = self.snapshot_mgr.compare_configurations('dev', 'production', 'database')
+        self.assertEqual(comparison['differences'], {'url': {'env1': 'localhost', 'env2': 'prod.db.com'}})
+
+    def test_range_iteration_stops_at_the_prefix(self):
+        environments = self.snapshot_mgr.environments
+        self.assertEqual(sorted(self.snapshot_mgr.list_environments()), ['dev', 'dev2', 'empty', 'production'])
+        self.assertEqual(list(environments['dev'].configurations), ['cache', 'database'])
+        self.assertEqual(list(environments['dev2'].configurations), ['database'])
+        self.assertEqual(len(environments['empty'].configurations), 0)
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.snapshot_mgr.add_environment('staging')
+        with self.assertRaises(TypeError):
+            self.snapshot_mgr.environments['dev'].add_configuration('cache', {'ttl': 1})
+
+class TestConcurrentEnvironmentManager(unittest.TestCase):
+    THREADS = 16
+
+    def setUp(self):
+        self.env_mgr = ConcurrentEnvironmentManager()
+
+    def run_threads(self, target):
+        barrier = threading.Barrier(self.THREADS)
+        results = [None] * self.THREADS
+
+        def run(index):
+            barrier.wait()
+            results[index] = target(index)
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_add_if_absent_has_one_winner(self):
+        for attempt in range(20):
+            env = self.env_mgr.get_or_add_environment(f'env{attempt}')
+            added = self.run_threads(lambda index: env.add_configuration_if_absent('database', {'port': index}))
+            self.assertEqual(added.count(True), 1)
+            self.assertEqual(env.configurations['database'], {'port': added.index(True)})
+
+    def test_get_or_add_environment_returns_one_environment(self):
+        environments = self.run_threads(lambda index: self.env_mgr.get_or_add_environment('development'))
+        self.assertTrue(all(env is environments[0] for env in environments))
+        self.assertEqual(self.env_mgr.list_environments(), ['development'])
+
+    def test_concurrent_writes_are_not_lost(self):
+        env = self.env_mgr.get_or_add_environment('development')
+
+        def add_many(index):
+            for number in range(50):
+                env.add_configuration_if_absent(f'config{index}-{number}', {'number': number})
+
+        self.run_threads(add_many)
+        self.assertEqual(len(env.configurations), self.THREADS * 50)
+
+    def test_readers_keep_their_snapshot(self):
+        env = self.env_mgr.get_or_add_environment('development')
+        env.add_configuration_if_absent('database', {'port': 5432})
+        snapshot = env.configurations
+        env.update_configuration('database', {'port': 5433}, verbose=False)
+        env.add_configuration_if_absent('cache', {'ttl': 60})
+        self.assertEqual(snapshot, {'database': {'port': 5432}})
+        self.assertEqual(self.env_mgr.get_configuration('development', 'database'), {'port': 5433})
+        self.assertIsNone(self.env_mgr.get_configuration('staging', 'database'))
+
+class TestConfigInterning(unittest.TestCase):
+    def setUp(self):
+        self.env_mgr = InternedEnvironmentManager()
+        for env_name in ('development', 'production'):
+            self.env_mgr.add_environment(env_name, verbose=False)
+            self.env_mgr.environments[env_name].add_configuration(
+                'database', {'url': 'localhost', 'replicas': [{'port': 5432}]}, verbose=False)
+
+    def config(self, env_name):
+        return self.env_mgr.environments[env_name].configurations['database']
+
+    def test_identical_values_share_one_node(self):
+        interner = ConfigInterner()
+        first = interner.intern({'url': 'localhost', 'replicas': [{'port': 5432}]})
+        second = interner.intern({'replicas': [{'port': 5432}], 'url': 'localhost'})
+        self.assertIs(first, second)
+        self.assertEqual(len(interner), 3)
+        self.assertIs(self.config('development'), self.config('production'))
+        self.assertIsInstance(self.config('development'), FrozenConfig)
+
+    def test_copy_on_write(self):
+        with self.assertRaises(TypeError):
+            self.config('development')['url'] = 'prod.db.com'
+        with self.assertRaises(TypeError):
+            self.config('development')['replicas'].append({'port': 5433})
+        value = thaw(self.config('development'))
+        value['url'] = 'prod.db.com'
+        self.env_mgr.environments['production'].update_configuration('database', value, verbose=False)
+        self.assertEqual(self.config('development')['url'], 'localhost')
+        self.assertEqual(self.config('production')['url'], 'prod.db.com')
+        self.assertIs(self.config('production')['replicas'], self.config('development')['replicas'])
+
+    def test_equality_follows_python(self):
+        interner = ConfigInterner()
+        integer = interner.intern({'port': 1, 'flags': [1, {'on': True}]})
+        floating = interner.intern({'port': 1.0, 'flags': [1.0, {'on': 1}]})
+        self.assertIsNot(integer, floating)
+        self.assertEqual(integer, floating)
+        self.assertEqual(hash(integer), hash(floating))
+        self.assertNotEqual(integer, interner.intern({'port': 2, 'flags': [1, {'on': True}]}))
+        self.assertEqual(integer, {'port': 1.0, 'flags': [1, {'on': 1}]})
+
+    def test_mixed_keys_and_non_json_values(self):
+        interner = ConfigInterner()
+        self.assertIs(interner.intern({1: 'a', '1': 'b'}), interner.intern({'1': 'b', 1: 'a'}))
+        environment = self.env_mgr.environments['development']
+        environment.add_configuration('hosts', {'names': {'a', 'b'}}, verbose=False)
+        self.assertEqual(environment.configurations['hosts'], {'names': {'a', 'b'}})
+        self.assertNotIsInstance(environment.configurations['hosts'], FrozenConfig)
+        matrix = self.env_mgr.compare_environments()
+        self.assertEqual(matrix.drifted_from('production'), {'development': ['hosts.names']})
+
+class TestEnvironmentDiff(unittest.TestCase):
+    def setUp(self):
+        self.env_mgr = InternedEnvironmentManager()
+        for env_name in ('development', 'production', 'staging'):
+            self.env_mgr.add_environment(env_name, verbose=False)
+        environments = self.env_mgr.environments
+        environments['development'].add_configuration('database', {'host': 'localhost', 'pool': {'size': 5}}, verbose=False)
+        environments['production'].add_configuration('database', {'host': 'prod.db.com', 'pool': {'size': 5}}, verbose=False)
+        environments['staging'].add_configuration('cache', {'ttl': 60}, verbose=False)
+
+    def test_drift_rows(self):
+        matrix = self.env_mgr.compare_environments()
+        rows = {(row['config_name'], row['path']): row for row in matrix.rows}
+        self.assertEqual(set(rows), {('database', ('host',)), ('database', ('pool', 'size')), ('cache', ('ttl',))})
+        self.assertEqual(rows[('database', ('host',))]['assignment'], [0, 1, -1])
+        self.assertEqual(matrix.drifted_from('development'),
+                         {'production': ['database.host'],
+                          'staging': ['database.host', 'database.pool.size', 'cache.ttl']})
+
+    def test_pairwise_differences_do_not_depend_on_the_audit(self):
+        expected = {'database.host': {'env1': 'localhost', 'env2': 'prod.db.com'}}
+        self.assertEqual(self.env_mgr.compare_environments(['development', 'production']).differences(
+            'development', 'production'), expected)
+        self.assertEqual(self.env_mgr.compare_environments().differences('development', 'production'), expected)
+        self.assertEqual(self.env_mgr.compare_environments().differences('development', 'staging', 'database'),
+                         {'host': {'env1': 'localhost', 'env2': None}, 'pool.size': {'env1': 5, 'env2': None}})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,168 @@
+import argparse
+import time
+
+import numpy as np
+
+from fleetstore import WEBSERVER, FleetStore
+
+# Availability analytics for a fleet, vectorised with NumPy. Two kinds of input:
+#
+#   fleet_report(fleet)          uptime/downtime totals of Server objects or a FleetStore
+#                                (the FleetStore columns are copied in one pass each)
+#   series_report(up, domains)   a (hosts, samples) array of up/down health samples taken
+#                                every `interval` seconds, e.g. from the health poller
+#
+# Both give availability %, percentiles over hosts and per-domain rollups; the series
+# also gives failure counts, MTBF and MTTR. Hosts without a domain roll up under None.
+#
+#   python analytics.py --hosts 50000 --days 30      (timing on synthetic samples)
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def fleet_columns(fleet):
+    # Returns (uptime, downtime, domains) with domains as a list aligned to the hosts.
+    if isinstance(fleet, FleetStore):
+        # Copies, not views: an ndarray over an array.array holds an export of its buffer,
+        # and while one lives FleetStore.append can't grow the column (BufferError).
+        uptime = np.array(fleet.uptime, dtype=np.float64)
+        downtime = np.array(fleet.downtime, dtype=np.float64)
+        labels = np.array(fleet.label, dtype=np.uint32)
+        is_web = np.array(fleet.kind, dtype=np.uint8) == WEBSERVER
+        codes = np.where(is_web, labels, 0)
+        return uptime, downtime, np.asarray(fleet.labels.values, dtype=object)[codes]
+    servers = list(fleet)
+    uptime = np.fromiter((server.uptime for server in servers), dtype=np.float64, count=len(servers))
+    downtime = np.fromiter((server.downtime for server in servers), dtype=np.float64, count=len(servers))
+    return uptime, downtime, [getattr(server, 'domain', None) for server in servers]
+
+
+def availability(uptime: np.ndarray, downtime: np.ndarray) -> np.ndarray:
+    total = uptime + downtime
+    return np.divide(uptime * 100.0, total, out=np.full(total.shape, np.nan), where=total > 0)
+
+
+def percentiles(values: np.ndarray, q=PERCENTILES) -> dict:
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {f"p{p}": None for p in q}
+    return {f"p{p}": float(v) for p, v in zip(q, np.percentile(values, q))}
+
+
+def series_stats(up: np.ndarray, interval: float = 300.0, chunk_rows: int = 4096) -> dict:
+    # up: (hosts, samples), truthy where the host answered. Processed in blocks of rows
+    # so the temporaries stay small even for 50k hosts x a month of samples.
+    up = np.asarray(up)
+    hosts, samples = up.shape
+    up_samples = np.zeros(hosts, dtype=np.int64)
+    failures = np.zeros(hosts, dtype=np.int64)
+    outages = np.zeros(hosts, dtype=np.int64)
+    # with no samples at all there is nothing to count (and no first column to read)
+    for start in range(0, hosts if samples else 0, chunk_rows):
+        block = up[start:start + chunk_rows].astype(bool, copy=False)
+        rows = slice(start, start + block.shape[0])
+        up_samples[rows] = np.count_nonzero(block, axis=1)
+        # an up -> down transition is a failure; an outage is any run of down samples
+        went_down = np.count_nonzero(block[:, :-1] & ~block[:, 1:], axis=1)
+        failures[rows] = went_down
+        outages[rows] = went_down + ~block[:, 0]
+
+    uptime = up_samples * interval
+    downtime = (samples - up_samples) * interval
+    return {
+        'uptime': uptime,
+        'downtime': downtime,
+        'availability': availability(uptime, downtime),
+        'failures': failures,
+        'outages': outages,
+        # mean time between failures / to repair; inf / nan where nothing failed
+        'mtbf': np.divide(uptime, failures, out=np.full(hosts, np.inf), where=failures > 0),
+        'mttr': np.divide(downtime, outages, out=np.full(hosts, np.nan), where=outages > 0)
+    }
+
+
+def domain_rollup(domains, uptime: np.ndarray, downtime: np.ndarray, failures: np.ndarray = None) -> dict:
+    codes = {}
+    inverse = np.fromiter((codes.setdefault(domain, len(codes)) for domain in domains),
+                          dtype=np.int64, count=len(uptime))
+    groups = len(codes)
+    hosts = np.bincount(inverse, minlength=groups)
+    up = np.bincount(inverse, weights=uptime, minlength=groups)
+    down = np.bincount(inverse, weights=downtime, minlength=groups)
+    per_host = availability(uptime, downtime)
+    worst = np.full(groups, np.inf)
+    np.fmin.at(worst, inverse, per_host)
+    fleet_availability = availability(up, down)
+    if failures is not None:
+        failed = np.bincount(inverse, weights=failures, minlength=groups)
+        mtbf = np.divide(up, failed, out=np.full(groups, np.inf), where=failed > 0)
+
+    rollup = {}
+    for domain, code in codes.items():
+        row = {
+            'hosts': int(hosts[code]),
+            'availability': float(fleet_availability[code]),
+            'worst_host_availability': None if np.isinf(worst[code]) else float(worst[code])
+        }
+        if failures is not None:
+            row['failures'] = int(failed[code])
+            row['mtbf'] = float(mtbf[code])
+        rollup[domain] = row
+    return rollup
+
+
+def fleet_report(fleet) -> dict:
+    uptime, downtime, domains = fleet_columns(fleet)
+    total_up, total_down = uptime.sum(), downtime.sum()
+    per_host = availability(uptime, downtime)
+    return {
+        'hosts': len(uptime),
+        'availability': float(total_up * 100.0 / (total_up + total_down)) if total_up + total_down else None,
+        'host_availability': percentiles(per_host),
+        'domains': domain_rollup(domains, uptime, downtime)
+    }
+
+
+def series_report(up: np.ndarray, domains=None, interval: float = 300.0) -> dict:
+    stats = series_stats(up, interval)
+    uptime, downtime, failures = stats['uptime'], stats['downtime'], stats['failures']
+    total_up, total_down, total_failures = uptime.sum(), downtime.sum(), failures.sum()
+    total_outages = stats['outages'].sum()
+    report = {
+        'hosts': len(uptime),
+        'availability': float(total_up * 100.0 / (total_up + total_down)) if total_up + total_down else None,
+        'failures': int(total_failures),
+        'mtbf': float(total_up / total_failures) if total_failures else None,
+        # pooled over the fleet, so a host with one long outage doesn't weigh the same as
+        # a host with many short ones
+        'mttr': float(total_down / total_outages) if total_outages else None,
+        'host_availability': percentiles(stats['availability']),
+        'host_mttr': percentiles(stats['mttr'])
+    }
+    if domains is not None:
+        report['domains'] = domain_rollup(domains, uptime, downtime, failures)
+    return report
+
+
+def benchmark(hosts: int, days: int, interval: float):
+    samples = int(days * 86400 / interval)
+    rng = np.random.default_rng(1)
+    up = np.empty((hosts, samples), dtype=bool)
+    for start in range(0, hosts, 4096):
+        up[start:start + 4096] = rng.random((min(4096, hosts - start), samples)) > 0.001
+    domains = [f"site{i % 500}.example.com" for i in range(hosts)]
+    started = time.perf_counter()
+    report = series_report(up, domains, interval)
+    elapsed = time.perf_counter() - started
+    print(f"{hosts:,} hosts x {samples:,} samples ({up.nbytes / 1e6:,.0f} MB) in {elapsed:.2f} s")
+    print(f"availability {report['availability']:.4f}%  failures {report['failures']:,}  "
+          f"mtbf {report['mtbf']:,.0f} s  mttr {report['mttr']:,.0f} s  domains {len(report['domains'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time series_report on synthetic health samples")
+    parser.add_argument('--hosts', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--interval', type=float, default=300.0, help='Seconds between samples')
+    args = parser.parse_args()
+    benchmark(args.hosts, args.days, args.interval)
@@ -0,0 +1,105 @@
+import threading
+
+# Registry for Server / Webserver / Databaseserver objects (server.py) with indexes kept
+# up to date as servers change, so lookups never scan the fleet:
+#   (ipAddress, port) -> server
+#   status            -> servers ("online", "offline"; compared case-insensitively)
+#   domain            -> Webservers
+# Status changes go through the Server.status setter (start() and stop() use it), which
+# hands them to set_status. ipAddress, port and domain are treated as fixed once added.
+
+
+def status_key(status) -> str:
+    return status.lower() if isinstance(status, str) else status
+
+
+class ServerFleet:
+    def __init__(self, servers=()):
+        self._servers = {}
+        self._by_status = {}
+        self._by_domain = {}
+        self._lock = threading.RLock()
+        for server in servers:
+            self.add(server)
+
+    def add(self, server):
+        address = (server.ipAddress, server.port)
+        with self._lock:
+            if address in self._servers:
+                raise ValueError(f"Server {address[0]}:{address[1]} is already in the fleet")
+            if server.fleet is not None:
+                raise ValueError(f"Server {address[0]}:{address[1]} belongs to another fleet")
+            self._servers[address] = server
+            self._by_status.setdefault(status_key(server.status), {})[address] = server
+            domain = getattr(server, 'domain', None)
+            if domain is not None:
+                self._by_domain.setdefault(domain, {})[address] = server
+            server.fleet = self
+
+    def remove(self, ipAddress, port):
+        address = (ipAddress, port)
+        with self._lock:
+            server = self._servers.pop(address)
+            self._discard(self._by_status, status_key(server.status), address)
+            domain = getattr(server, 'domain', None)
+            if domain is not None:
+                self._discard(self._by_domain, domain, address)
+            server.fleet = None
+            return server
+
+    @staticmethod
+    def _discard(index: dict, key, address):
+        bucket = index[key]
+        del bucket[address]
+        if not bucket:
+            del index[key]
+
+    def set_status(self, server, status):
+        # Reading the old status, assigning the new one and moving the server between
+        # indexes all happen under the lock, so concurrent changes can't leave it indexed
+        # under a status it no longer has.
+        with self._lock:
+            if server.fleet is not self:
+                # removed (and perhaps re-added elsewhere) since the setter looked
+                retry = True
+            else:
+                retry = False
+                old = status_key(server._status)
+                server._status = status
+                new = status_key(status)
+                if old != new:
+                    address = (server.ipAddress, server.port)
+                    self._discard(self._by_status, old, address)
+                    self._by_status.setdefault(new, {})[address] = server
+        if retry:
+            server.status = status
+
+    def get(self, ipAddress, port):
+        return self._servers.get((ipAddress, port))
+
+    def with_status(self, status) -> list:
+        with self._lock:
+            return list(self._by_status.get(status_key(status), {}).values())
+
+    def online(self) -> list:
+        return self.with_status("online")
+
+    def offline(self) -> list:
+        return self.with_status("offline")
+
+    def with_domain(self, domain) -> list:
+        with self._lock:
+            return list(self._by_domain.get(domain, {}).values())
+
+    def status_counts(self) -> dict:
+        with self._lock:
+            return {status: len(servers) for status, servers in self._by_status.items()}
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def __iter__(self):
+        return iter(list(self._servers.values()))
+
+    def __contains__(self, server) -> bool:
+        return self._servers.get((server.ipAddress, server.port)) is server
@@ -0,0 +1,223 @@
+import argparse
+import ipaddress
+import socket
+import tracemalloc
+from array import array
+
+from fleet import status_key
+from server import Databaseserver, Server, Webserver
+
+# Columnar storage for large fleets. Instead of one Server object (and its __dict__) per
+# host, each field is a column:
+#   ip        array('I')   IPv4 packed into 32 bits (hostnames such as "localhost" kept aside)
+#   port      array('H')
+#   status    bytearray    code into a small table of status strings (lower-cased, as in
+#                          ServerFleet, so "Offline" and "offline" are one status)
+#   uptime    array('d')
+#   downtime  array('d')
+#   kind      bytearray    Server, Webserver or Databaseserver
+#   label     array('I')   code into a table of domains / database URLs (0 = none)
+# store[i] returns a view that behaves like the matching Server class, so start(), stop()
+# and displayServerInformation() work unchanged and write straight into the columns.
+#
+#   python fleetstore.py --hosts 100000      (memory against one object per host)
+
+SERVER, WEBSERVER, DATABASESERVER = range(3)
+NO_ADDRESS = 0xFFFFFFFF
+
+
+def pack_ip(ipAddress: str) -> int:
+    # Strict dotted-quad only: inet_aton would read "010.1.1.1" as octal (8.1.1.1).
+    # Hostnames are NO_ADDRESS; something shaped like an IPv4 address that isn't one is
+    # rejected rather than stored as a hostname.
+    try:
+        return int(ipaddress.IPv4Address(ipAddress))
+    except ValueError:
+        parts = ipAddress.split('.')
+        if len(parts) == 4 and all(part.isdigit() for part in parts):
+            raise ValueError(f"Invalid IPv4 address {ipAddress!r}") from None
+        return NO_ADDRESS
+
+
+def unpack_ip(packed: int) -> str:
+    return socket.inet_ntoa(packed.to_bytes(4, 'big'))
+
+
+class _Table:
+    # Interned strings: value -> code and code -> value.
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value, limit: int = None) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if limit is not None and code >= limit:
+                raise ValueError(f"More than {limit} distinct values")
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+
+class FleetStore:
+    def __init__(self):
+        self.ip = array('I')
+        self.port = array('H')
+        self.status = bytearray()
+        self.uptime = array('d')
+        self.downtime = array('d')
+        self.kind = bytearray()
+        self.label = array('I')
+        self.hostnames = {}
+        self.statuses = _Table(['offline', 'online'])
+        self.labels = _Table([None])
+
+    def append(self, ipAddress, port, status, uptime, downtime, kind: int = SERVER, label=None) -> int:
+        index = len(self.port)
+        packed = pack_ip(ipAddress)
+        if packed == NO_ADDRESS:
+            self.hostnames[index] = ipAddress
+        self.ip.append(packed)
+        self.port.append(port)
+        self.status.append(self.statuses.code(status_key(status), 256))
+        self.uptime.append(uptime)
+        self.downtime.append(downtime)
+        self.kind.append(kind)
+        self.label.append(self.labels.code(label))
+        return index
+
+    def add(self, server) -> int:
+        if isinstance(server, Webserver):
+            return self.append(server.ipAddress, server.port, server.status, server.uptime,
+                               server.downtime, WEBSERVER, server.domain)
+        if isinstance(server, Databaseserver):
+            return self.append(server.ipAddress, server.port, server.status, server.uptime,
+                               server.downtime, DATABASESERVER, server.databaseURL)
+        return self.append(server.ipAddress, server.port, server.status, server.uptime, server.downtime)
+
+    def __len__(self) -> int:
+        return len(self.port)
+
+    def __getitem__(self, index: int):
+        if not -len(self) <= index < len(self):
+            raise IndexError("fleet index out of range")
+        index %= len(self)
+        return VIEWS[self.kind[index]](self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def indexes_with_status(self, status) -> list:
+        # bytearray.find scans in C, so this stays fast without a separate index.
+        code = self.statuses.codes.get(status_key(status))
+        if code is None:
+            return []
+        found = []
+        index = self.status.find(code)
+        while index != -1:
+            found.append(index)
+            index = self.status.find(code, index + 1)
+        return found
+
+    def with_status(self, status) -> list:
+        return [self[index] for index in self.indexes_with_status(status)]
+
+    def nbytes(self) -> int:
+        columns = (self.ip, self.port, self.uptime, self.downtime, self.label)
+        return (sum(column.itemsize * len(column) for column in columns)
+                + len(self.status) + len(self.kind))
+
+
+class ServerView(Server):
+    # Views are created on access and not kept, so their own size doesn't matter.
+    fleet = None
+
+    def __init__(self, store: FleetStore, index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def ipAddress(self):
+        packed = self._store.ip[self._index]
+        if packed == NO_ADDRESS:
+            return self._store.hostnames[self._index]
+        return unpack_ip(packed)
+
+    @property
+    def port(self):
+        return self._store.port[self._index]
+
+    @property
+    def status(self):
+        return self._store.statuses.values[self._store.status[self._index]]
+
+    @status.setter
+    def status(self, value):
+        self._store.status[self._index] = self._store.statuses.code(status_key(value), 256)
+
+    @property
+    def uptime(self):
+        return self._store.uptime[self._index]
+
+    @uptime.setter
+    def uptime(self, value):
+        self._store.uptime[self._index] = value
+
+    @property
+    def downtime(self):
+        return self._store.downtime[self._index]
+
+    @downtime.setter
+    def downtime(self, value):
+        self._store.downtime[self._index] = value
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.ipAddress}:{self.port} {self.status}>"
+
+
+class WebserverView(ServerView, Webserver):
+    @property
+    def domain(self):
+        return self._store.labels.values[self._store.label[self._index]]
+
+
+class DatabaseserverView(ServerView, Databaseserver):
+    @property
+    def databaseURL(self):
+        return self._store.labels.values[self._store.label[self._index]]
+
+
+VIEWS = (ServerView, WebserverView, DatabaseserverView)
+
+
+def host(i: int) -> str:
+    return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+
+def benchmark(hosts: int):
+    tracemalloc.start()
+    servers = [Webserver(host(i), 8000 + i % 1000, "online" if i % 10 else "offline",
+                         float(i % 720), float(i % 24), f"site{i % 500}.example.com") for i in range(hosts)]
+    objects = tracemalloc.get_traced_memory()[0]
+    del servers
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = FleetStore()
+    for i in range(hosts):
+        store.append(host(i), 8000 + i % 1000, "online" if i % 10 else "offline",
+                     float(i % 720), float(i % 24), WEBSERVER, f"site{i % 500}.example.com")
+    columns = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{hosts:,} hosts")
+    print(f"objects   {objects / 1e6:8.1f} MB  ({objects / hosts:.0f} B/host)")
+    print(f"columnar  {columns / 1e6:8.1f} MB  ({columns / hosts:.0f} B/host, columns {store.nbytes() / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of Server objects against FleetStore")
+    parser.add_argument('--hosts', type=int, default=100000)
+    benchmark(parser.parse_args().hosts)
@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import OrderedDict
+
+# Asyncio health checks that keep Server.status, uptime and downtime current. Works with
+# server.py objects (and so with ServerFleet indexes) or FleetStore views:
+#
+#   checker = HealthChecker(fleet, interval=10, timeout=2, concurrency=2000)
+#   await checker.run()                  # until checker.stop()
+#
+# - Each host is checked every `interval` seconds, +/- `jitter` (a fraction) so checks
+#   don't arrive in lockstep.
+# - A failing host backs off: interval * 2**(failures - 1), capped at max_backoff.
+# - The default probe is a TCP connect to ipAddress:port, closed straight away. With
+#   reuse_connections=True the connection is instead kept open for up to `keepalive`
+#   seconds and drained in the background (so a banner doesn't hide a FIN); while it is open
+#   the host counts as up without a new connect. At most `max_connections` are held, the
+#   least recently used closed first, and after the window a new connect is made so a host
+#   that vanished without FIN/RST is caught. Any async callable probe(server) -> bool can
+#   be passed instead.
+# - After each check the time since the previous check is added to uptime or downtime
+#   (in units of time_unit seconds), according to the state seen at that previous check.
+
+
+class HostState:
+    __slots__ = ('server', 'up', 'failures', 'checked_at', 'writer', 'drain', 'connected_at')
+
+    def __init__(self, server):
+        self.server = server
+        self.up = None
+        self.failures = 0
+        self.checked_at = None
+        self.writer = self.drain = None
+        self.connected_at = None
+
+    def close(self):
+        if self.drain is not None:
+            self.drain.cancel()
+        if self.writer is not None:
+            self.writer.close()
+        self.writer = self.drain = None
+
+
+class HealthChecker:
+    def __init__(self, servers, interval: float = 10.0, timeout: float = 2.0, concurrency: int = 1000,
+                 jitter: float = 0.1, max_backoff: float = 300.0, probe=None,
+                 reuse_connections: bool = False, keepalive: float = 30.0, max_connections: int = 100,
+                 time_unit: float = 1.0):
+        self.hosts = [HostState(server) for server in servers]
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.probe = probe
+        self.reuse_connections = reuse_connections
+        self.keepalive = keepalive
+        self.max_connections = max_connections
+        # hosts holding an open connection, least recently used first
+        self._pool = OrderedDict()
+        self.time_unit = time_unit
+        self.checks = 0
+        self.failed_checks = 0
+        self._running = False
+        self._wakeup = None
+
+    def delay(self, state: HostState) -> float:
+        base = self.interval
+        if state.failures:
+            base = min(self.max_backoff, self.interval * 2 ** (state.failures - 1))
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    @staticmethod
+    async def _drain(reader):
+        # Reads and discards whatever the peer sends; finishes when it closes or resets.
+        try:
+            while await reader.read(65536):
+                pass
+        except OSError:
+            pass
+
+    async def _tcp_probe(self, state: HostState) -> bool:
+        if state.writer is not None:
+            if (not state.drain.done() and not state.writer.is_closing()
+                    and time.monotonic() - state.connected_at < self.keepalive):
+                self._pool.move_to_end(state)
+                return True
+            self._release(state)
+        server = state.server
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(server.ipAddress, server.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        if self.reuse_connections and self.max_connections > 0:
+            while len(self._pool) >= self.max_connections:
+                self._release(next(iter(self._pool)))
+            state.writer, state.connected_at = writer, time.monotonic()
+            state.drain = asyncio.ensure_future(self._drain(reader))
+            self._pool[state] = None
+        else:
+            writer.close()
+        return True
+
+    def _release(self, state: HostState):
+        self._pool.pop(state, None)
+        state.close()
+
+    async def check(self, state: HostState) -> bool:
+        try:
+            if self.probe is None:
+                up = await self._tcp_probe(state)
+            else:
+                up = bool(await asyncio.wait_for(self.probe(state.server), self.timeout))
+        except Exception:
+            up = False
+        self._record(state, up, time.monotonic())
+        return up
+
+    def _record(self, state: HostState, up: bool, now: float):
+        server = state.server
+        if state.checked_at is not None:
+            elapsed = (now - state.checked_at) / self.time_unit
+            if state.up:
+                server.uptime += elapsed
+            else:
+                server.downtime += elapsed
+        state.checked_at = now
+        state.up = up
+        state.failures = 0 if up else state.failures + 1
+        status = "online" if up else "offline"
+        if server.status != status:
+            server.status = status
+        self.checks += 1
+        if not up:
+            self.failed_checks += 1
+            self._release(state)
+
+    async def check_once(self) -> int:
+        # Checks every host now; returns how many are up.
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(state):
+            async with semaphore:
+                return await self.check(state)
+
+        return sum(await asyncio.gather(*(bounded(state) for state in self.hosts)))
+
+    async def run(self, duration: float = None):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        counter = itertools.count()
+        start = loop.time()
+        # first round spread over one interval
+        due = [(start + random.uniform(0, self.interval), next(counter), state) for state in self.hosts]
+        heapq.heapify(due)
+        in_flight = set()
+        self._running = True
+
+        async def checked(state):
+            try:
+                await self.check(state)
+            finally:
+                semaphore.release()
+                entry = (loop.time() + self.delay(state), next(counter), state)
+                heapq.heappush(due, entry)
+                if due[0] is entry:
+                    self._wake()
+
+        try:
+            while self._running and (duration is None or loop.time() - start < duration):
+                now = loop.time()
+                while due and due[0][0] <= now and self._running:
+                    await semaphore.acquire()
+                    state = heapq.heappop(due)[2]
+                    task = asyncio.ensure_future(checked(state))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                wait = (due[0][0] - loop.time()) if due else self.interval
+                if duration is not None:
+                    wait = min(wait, start + duration - loop.time())
+                self._wakeup = loop.create_future()
+                try:
+                    await asyncio.wait_for(self._wakeup, max(0.0, wait))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._running = False
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            self.close()
+
+    def _wake(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    def stop(self):
+        self._running = False
+        self._wake()
+
+    def close(self):
+        for state in self.hosts:
+            state.close()
+        self._pool.clear()
@@ -0,0 +1,182 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Bulk start / stop / restart across many servers (server.py objects, FleetStore views or
+# anything with ipAddress, port and status), in waves with bounded concurrency:
+#
+#   result = rolling_operation(fleet, "restart", waves=(1, 0.1, 1.0), concurrency=64, timeout=30)
+#   print(result.summary())
+#
+# waves are cumulative targets: an int is a number of servers, a float a fraction of the
+# fleet, so (1, 0.1, 1.0) is one canary, then up to 10%, then everyone. After each wave the
+# run halts if more than max_failures (a fraction of the servers done so far) have failed.
+#
+# What an operation does to a host is the action: a callable action(server, operation),
+# plain or async. Plain actions run on a thread pool; async ones run on the event loop and
+# are cancelled when they time out. local_action only flips status; FakeBackend adds
+# delays and failures for tests and dry runs.
+
+WAVES = (1, 0.1, 1.0)
+
+
+class HostError(Exception):
+    pass
+
+
+def local_action(server, operation: str):
+    # start()/stop() without the prints.
+    if operation in ("stop", "restart"):
+        if operation == "stop" and server.status != "online":
+            raise HostError("server is already offline")
+        server.status = "offline"
+    if operation in ("start", "restart"):
+        server.status = "online"
+    elif operation != "stop":
+        raise HostError(f"unknown operation {operation!r}")
+
+
+class FakeBackend:
+    def __init__(self, delays: dict = None, failures=(), default_delay: float = 0.0):
+        # delays and failures are keyed by (ipAddress, port)
+        self.delays = delays or {}
+        self.failures = set(failures)
+        self.default_delay = default_delay
+        self.calls = []
+
+    async def __call__(self, server, operation: str):
+        address = (server.ipAddress, server.port)
+        self.calls.append((address, operation))
+        await asyncio.sleep(self.delays.get(address, self.default_delay))
+        if address in self.failures:
+            raise HostError(f"{operation} failed on {address[0]}:{address[1]}")
+        local_action(server, operation)
+
+
+class HostResult:
+    def __init__(self, server, operation: str, wave: int, ok: bool, seconds: float,
+                 error: str = None, timed_out: bool = False):
+        self.server = server
+        self.operation = operation
+        self.wave = wave
+        self.ok = ok
+        self.seconds = seconds
+        self.error = error
+        self.timed_out = timed_out
+
+    def __repr__(self):
+        outcome = "ok" if self.ok else ("timed out" if self.timed_out else self.error)
+        return f"<HostResult {self.server.ipAddress}:{self.server.port} {self.operation} {outcome}>"
+
+
+class BulkResult:
+    def __init__(self, operation: str, total: int):
+        self.operation = operation
+        self.total = total
+        self.results = []
+        self.waves = []
+        self.halted = False
+        self.seconds = 0.0
+
+    @property
+    def succeeded(self) -> list:
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> list:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def timed_out(self) -> list:
+        return [result for result in self.results if result.timed_out]
+
+    @property
+    def skipped(self) -> int:
+        return self.total - len(self.results)
+
+    def summary(self) -> dict:
+        durations = sorted(result.seconds for result in self.results)
+        return {
+            'operation': self.operation,
+            'total': self.total,
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'timed_out': len(self.timed_out),
+            'skipped': self.skipped,
+            'waves': self.waves,
+            'halted': self.halted,
+            'seconds': self.seconds,
+            'slowest_host_seconds': durations[-1] if durations else 0.0
+        }
+
+
+def wave_sizes(total: int, waves=WAVES) -> list:
+    sizes = []
+    done = 0
+    for wave in waves:
+        target = round(total * wave) if isinstance(wave, float) else wave
+        target = min(total, max(target, done + 1 if done < total else done))
+        if target > done:
+            sizes.append(target - done)
+            done = target
+    if done < total:
+        sizes.append(total - done)
+    return sizes
+
+
+async def _run_host(server, operation, wave, action, semaphore, timeout, executor):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(action) or inspect.iscoroutinefunction(getattr(action, '__call__', None)):
+                call = action(server, operation)
+            else:
+                # A thread cannot be cancelled: on timeout it is abandoned and finishes in
+                # the background, still holding a pool thread.
+                call = asyncio.get_running_loop().run_in_executor(executor, action, server, operation)
+            await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            return HostResult(server, operation, wave, False, time.perf_counter() - start,
+                              f"timed out after {timeout}s", timed_out=True)
+        except Exception as error:
+            return HostResult(server, operation, wave, False, time.perf_counter() - start, str(error))
+        return HostResult(server, operation, wave, True, time.perf_counter() - start)
+
+
+async def rolling_operation_async(servers, operation: str, action=local_action, waves=WAVES,
+                                  concurrency: int = 64, timeout: float = 30.0,
+                                  max_failures: float = 0.0) -> BulkResult:
+    servers = list(servers)
+    result = BulkResult(operation, len(servers))
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        done = 0
+        for wave, size in enumerate(wave_sizes(len(servers), waves)):
+            batch = servers[done:done + size]
+            done += size
+            result.results.extend(await asyncio.gather(
+                *(_run_host(server, operation, wave, action, semaphore, timeout, executor) for server in batch)))
+            result.waves.append(size)
+            if len(result.failed) > max_failures * len(result.results):
+                result.halted = done < len(servers)
+                break
+    finally:
+        # Don't wait for abandoned (timed out) threads.
+        executor.shutdown(wait=False)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def rolling_operation(servers, operation: str, **options) -> BulkResult:
+    return asyncio.run(rolling_operation_async(servers, operation, **options))
+
+
+def start_all(servers, **options) -> BulkResult:
+    return rolling_operation(servers, "start", **options)
+
+
+def stop_all(servers, **options) -> BulkResult:
+    return rolling_operation(servers, "stop", **options)